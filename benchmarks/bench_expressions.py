@@ -0,0 +1,39 @@
+from lxml import etree
+from pycalphad import Database
+from pycalphad.io.tdb import _sympify_string
+from pycalphad_xml.parser import _normalize_math_string, _parse_polynomial, ParseContext, parse_phase_data
+from .synthetic import gibbs_polynomial, make_xml
+
+
+class PolynomialParsing:
+    "Conversion of distinct Gibbs energy polynomials by the fast path and by the general parser."
+    params = ["fast path", "sympify"]
+    param_names = ["parser"]
+
+    def setup(self, parser):
+        self.math_strings = [_normalize_math_string(str(gibbs_polynomial(seed)).replace('log(', 'ln('))
+                             for seed in range(2000)]
+
+    def time_convert(self, parser):
+        if parser == "fast path":
+            for math_string in self.math_strings:
+                _parse_polynomial(math_string)
+        else:
+            for math_string in self.math_strings:
+                _sympify_string(math_string+'+0')
+
+
+class ParameterParsing:
+    "Extraction of parameter data from Phase nodes, excluding the conversion of values to expressions."
+    number = 1
+    repeat = 5
+
+    def setup(self):
+        xml = make_xml(n_elements=6, n_phases=20, n_parameters=200, n_intervals=2)
+        self.phase_nodes = etree.fromstring(xml.encode()).findall('Phase')
+        self.species = Database.from_string(xml, fmt="xml").species
+
+    def time_parse_phase_data(self):
+        context = ParseContext(self.species, lazy=True)
+        for phase_node in self.phase_nodes:
+            parse_phase_data(context, phase_node)
@@ -0,0 +1,30 @@
+from pycalphad import Database
+from pycalphad_xml.parser import read_xml, clear_expression_cache
+from pycalphad_xml.index import build_index, read_xml_indexed
+from .synthetic import make_xml
+
+
+class SinglePhaseRead:
+    "Loading one phase of databases with an increasing number of phases, with and without an index."
+    params = [[10, 100, 1000]]
+    param_names = ["n_phases"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        for n_phases in self.params[0]:
+            path = f"phases-{n_phases}.xml"
+            with open(path, "w") as fd:
+                fd.write(make_xml(n_elements=3, n_phases=n_phases, n_parameters=20, n_intervals=2))
+            build_index(path)
+
+    def setup(self, n_phases):
+        self.path = f"phases-{n_phases}.xml"
+        clear_expression_cache()
+
+    def time_read_xml(self, n_phases):
+        with open(self.path) as fd:
+            read_xml(Database(), fd, phases=["PHASE0"], validate="off")
+
+    def time_read_xml_indexed(self, n_phases):
+        read_xml_indexed(Database(), self.path, phases=["PHASE0"])
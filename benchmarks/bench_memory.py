@@ -0,0 +1,58 @@
+import tracemalloc
+from pycalphad import Database
+from pycalphad_xml.parser import read_xml
+from .synthetic import make_xml
+
+# Large databases of each model, with many parameters sharing the same constituents
+DATABASES = {
+    "CEF": dict(n_elements=8, n_phases=200, n_sublattices=3, n_parameters=60, n_intervals=1),
+    "MQMQA": dict(n_elements=12, n_phases=4, n_parameters=2000, n_intervals=1),
+}
+
+
+class ReadAllocations:
+    """Memory allocated by Python objects while reading a large database, as traced by tracemalloc.
+
+    Values are read lazily, so that the measurements are dominated by the
+    phase, constituent and parameter data rather than by SymEngine expressions,
+    which are allocated outside of the Python allocator.
+    """
+    params = list(DATABASES)
+    param_names = ["model"]
+    number = 1
+    repeat = 1
+    timeout = 600
+
+    def setup_cache(self):
+        paths = {}
+        for model, kwargs in DATABASES.items():
+            paths[model] = f"allocations-{model}.xml"
+            with open(paths[model], "w") as fd:
+                fd.write(make_xml(model, **kwargs))
+        return paths
+
+    def setup(self, paths, model):
+        tracemalloc.start()
+        try:
+            with open(paths[model]) as fd:
+                dbf = Database()
+                read_xml(dbf, fd, validate="off", lazy=True)
+            self.retained, self.peak = tracemalloc.get_traced_memory()
+            self.blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        finally:
+            tracemalloc.stop()
+
+    def track_peak(self, paths, model):
+        "Peak size of the memory blocks allocated during the read."
+        return self.peak
+    track_peak.unit = "bytes"
+
+    def track_retained(self, paths, model):
+        "Size of the memory blocks still allocated after the read, i.e. held by the Database."
+        return self.retained
+    track_retained.unit = "bytes"
+
+    def track_retained_blocks(self, paths, model):
+        "Number of memory blocks still allocated after the read."
+        return self.blocks
+    track_retained_blocks.unit = "blocks"
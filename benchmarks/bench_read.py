@@ -0,0 +1,53 @@
+import time
+from pycalphad import Database
+from pycalphad_xml.parser import clear_expression_cache, read_xml
+from .synthetic import make_xml
+
+
+class StreamingRead:
+    "Peak memory of tree-based and streaming reads of a large database."
+    params = [False, True]
+    param_names = ["stream"]
+    timeout = 600
+
+    def setup_cache(self):
+        path = "large.xml"
+        with open(path, "w") as fd:
+            fd.write(make_xml(n_elements=8, n_phases=200, n_parameters=60, n_intervals=3))
+        return path
+
+    def peakmem_read_xml(self, path, stream):
+        with open(path) as fd:
+            read_xml(Database(), fd, validate="off", stream=stream)
+
+    def time_read_xml(self, path, stream):
+        with open(path) as fd:
+            read_xml(Database(), fd, validate="off", stream=stream)
+
+
+class ParallelRead:
+    "Reading a large database with phases parsed in a pool of worker processes."
+    params = ([1, 2, 4], [False, True])
+    param_names = ["workers", "lazy"]
+    timeout = 600
+
+    def setup_cache(self):
+        path = "parallel.xml"
+        with open(path, "w") as fd:
+            fd.write(make_xml(n_elements=8, n_phases=200, n_parameters=60, n_intervals=3))
+        return path
+
+    def setup(self, path, workers, lazy):
+        clear_expression_cache()
+
+    def time_read_xml(self, path, workers, lazy):
+        with open(path) as fd:
+            read_xml(Database(), fd, validate="off", workers=workers, lazy=lazy)
+
+    def track_parent_cpu_time(self, path, workers, lazy):
+        "CPU time of the calling process, the part of the read that is not spread over the workers."
+        start = time.process_time()
+        with open(path) as fd:
+            read_xml(Database(), fd, validate="off", workers=workers, lazy=lazy)
+        return time.process_time() - start
+    track_parent_cpu_time.unit = "seconds"
@@ -0,0 +1,74 @@
+from io import StringIO
+from pycalphad import Database
+from pycalphad_xml.parser import write_xml, clear_expression_cache
+from .synthetic import make_xml
+
+# Synthetic databases by model and size, scaled along each dimension of the generators
+DATABASES = {
+    ("CEF", "small"): dict(n_elements=3, n_phases=5, n_sublattices=2, n_parameters=10, n_intervals=1),
+    ("CEF", "phases"): dict(n_elements=3, n_phases=100, n_sublattices=2, n_parameters=10, n_intervals=1),
+    ("CEF", "parameters"): dict(n_elements=3, n_phases=5, n_sublattices=2, n_parameters=200, n_intervals=1),
+    ("CEF", "sublattices"): dict(n_elements=3, n_phases=5, n_sublattices=8, n_parameters=10, n_intervals=1),
+    ("CEF", "intervals"): dict(n_elements=3, n_phases=5, n_sublattices=2, n_parameters=10, n_intervals=20),
+    ("CEF", "elements"): dict(n_elements=30, n_phases=5, n_sublattices=2, n_parameters=40, n_intervals=1),
+    ("MQMQA", "small"): dict(n_elements=4, n_phases=1, n_parameters=10, n_intervals=1),
+    ("MQMQA", "phases"): dict(n_elements=4, n_phases=20, n_parameters=10, n_intervals=1),
+    ("MQMQA", "parameters"): dict(n_elements=4, n_phases=1, n_parameters=200, n_intervals=1),
+    ("MQMQA", "intervals"): dict(n_elements=4, n_phases=1, n_parameters=10, n_intervals=20),
+    ("MQMQA", "elements"): dict(n_elements=12, n_phases=1, n_parameters=10, n_intervals=1),
+}
+MODELS = ["CEF", "MQMQA"]
+SIZES = ["small", "phases", "parameters", "sublattices", "intervals", "elements"]
+
+
+class _Scaling:
+    params = [MODELS, SIZES]
+    param_names = ["model", "scaled"]
+    number = 1
+    timeout = 600
+
+    def setup_cache(self):
+        paths = {}
+        for (model, size), kwargs in DATABASES.items():
+            paths[model, size] = f"{model}-{size}.xml"
+            with open(paths[model, size], "w") as fd:
+                fd.write(make_xml(model, **kwargs))
+        return paths
+
+    def setup(self, paths, model, size):
+        if (model, size) not in paths:
+            raise NotImplementedError("MQMQA phases have no sublattice count to scale")
+        self.path = paths[model, size]
+        # Expressions repeat across reads, measure reads that start with an empty expression cache
+        clear_expression_cache()
+
+
+class Read(_Scaling):
+    "Reading synthetic databases of each kind and size."
+    def time_read_xml(self, paths, model, size):
+        Database(self.path)
+
+    def peakmem_read_xml(self, paths, model, size):
+        Database(self.path)
+
+
+class Write(_Scaling):
+    "Writing synthetic databases of each kind and size."
+    def setup(self, paths, model, size):
+        super().setup(paths, model, size)
+        self.dbf = Database(self.path)
+
+    def time_write_xml(self, paths, model, size):
+        write_xml(self.dbf, StringIO())
+
+    def peakmem_write_xml(self, paths, model, size):
+        write_xml(self.dbf, StringIO())
+
+
+class RoundTrip(_Scaling):
+    "Reading synthetic databases of each kind and size and writing them back."
+    def time_round_trip(self, paths, model, size):
+        write_xml(Database(self.path), StringIO())
+
+    def peakmem_round_trip(self, paths, model, size):
+        write_xml(Database(self.path), StringIO())
@@ -0,0 +1,44 @@
+import time
+from pycalphad import Database
+from pycalphad_xml.parser import write_xml
+from .synthetic import make_xml
+
+
+class StreamingWrite:
+    "Peak memory of tree-based and streaming writes of a large database."
+    params = [False, True]
+    param_names = ["stream"]
+    timeout = 600
+
+    def setup(self, stream):
+        self.dbf = Database.from_string(make_xml(n_elements=8, n_phases=200, n_parameters=60, n_intervals=3), fmt="xml")
+
+    def peakmem_write_xml(self, stream):
+        with open("out.xml", "w") as fd:
+            write_xml(self.dbf, fd, validate="off", stream=stream)
+
+    def time_write_xml(self, stream):
+        with open("out.xml", "w") as fd:
+            write_xml(self.dbf, fd, validate="off", stream=stream)
+
+
+class ParallelWrite:
+    "Writing a large database with phases serialized in a pool of worker processes."
+    params = [1, 2, 4]
+    param_names = ["workers"]
+    timeout = 600
+
+    def setup(self, workers):
+        self.dbf = Database.from_string(make_xml(n_elements=8, n_phases=200, n_parameters=60, n_intervals=3), fmt="xml")
+
+    def time_write_xml(self, workers):
+        with open("out.xml", "wb") as fd:
+            write_xml(self.dbf, fd, validate="off", workers=workers)
+
+    def track_parent_cpu_time(self, workers):
+        "CPU time of the calling process, the part of the write that is not spread over the workers."
+        start = time.process_time()
+        with open("out.xml", "wb") as fd:
+            write_xml(self.dbf, fd, validate="off", workers=workers)
+        return time.process_time() - start
+    track_parent_cpu_time.unit = "seconds"
@@ -0,0 +1,142 @@
+"""
+Generators of synthetic, schema-valid databases for benchmarking.
+"""
+import itertools
+from io import StringIO
+from symengine import Piecewise, And, Symbol, log
+from pycalphad import Database, variables as v
+from pycalphad_xml.parser import write_xml
+
+
+def gibbs_polynomial(seed):
+    "Gibbs energy expression in the canonical CALPHAD form, with coefficients derived from `seed`."
+    a, b, c, d, e, f = (seed + 1.0) * -1000.5, seed + 12.25, -(seed % 7) - 2.5, 1.5e-3 * (seed % 5 + 1), -2.5e-7, 7.75e4
+    return a + b*v.T + c*v.T*log(v.T) + d*v.T**2 + e*v.T**3 + f*v.T**(-1)
+
+
+def temperature_piecewise(seed, n_intervals, reference=0):
+    "Piecewise expression in T with `n_intervals` contiguous intervals between 298.15 and 6000 K, each added to `reference`."
+    bounds = [298.15 + i * (6000.0 - 298.15) / n_intervals for i in range(n_intervals)] + [6000.0]
+    exprs_conds = [(reference + gibbs_polynomial(seed + i), And(lower <= v.T, v.T < upper))
+                   for i, (lower, upper) in enumerate(zip(bounds[:-1], bounds[1:]))]
+    return Piecewise(*(exprs_conds + [(0, True)]))
+
+
+def _add_elements(dbf, n_elements, n_intervals):
+    elements = [f"EL{i}" for i in range(n_elements)]
+    for el in elements:
+        dbf.elements.add(el)
+        dbf.species.add(v.Species(el))
+        dbf.refstates[el] = {'phase': 'BLANK', 'mass': 1.0, 'H298': 0.0, 'S298': 0.0}
+        dbf.symbols[f"GHSER{el}"] = temperature_piecewise(len(dbf.symbols), n_intervals)
+    return elements
+
+
+def make_database(n_elements=3, n_phases=10, n_sublattices=2, n_parameters=20, n_intervals=2):
+    """
+    Build a synthetic Database of CEF phases with every element on every sublattice.
+
+    Parameters
+    ----------
+    n_elements : int
+        Number of pure elements. Each element gets a reference `Expr`.
+    n_phases : int
+        Number of phases.
+    n_sublattices : int
+        Number of sublattices of each phase.
+    n_parameters : int
+        Number of parameters per phase. The first are endmember G parameters of
+        each element, the rest are binary L parameters up to fourth order.
+    n_intervals : int
+        Number of temperature intervals in each parameter value.
+
+    Returns
+    -------
+    Database
+    """
+    dbf = Database()
+    elements = _add_elements(dbf, n_elements, n_intervals)
+    pairs = list(itertools.combinations(elements, 2)) or [(elements[0], elements[0])]
+    for phase_idx in range(n_phases):
+        phase_name = f"PHASE{phase_idx}"
+        dbf.add_structure_entry(phase_name, phase_name)
+        dbf.add_phase(phase_name, {}, [float(i + 1) for i in range(n_sublattices)])
+        dbf.add_phase_constituents(phase_name, [elements] * n_sublattices)
+        for param_idx in range(n_parameters):
+            if param_idx < n_elements:
+                el = elements[param_idx]
+                value = temperature_piecewise(param_idx, n_intervals, reference=Symbol(f"GHSER{el}"))
+                dbf.add_parameter("G", phase_name, [[el]] * n_sublattices, 0, value, force_insert=False)
+            else:
+                pair_idx, order = divmod(param_idx - n_elements, 4)
+                pair = pairs[pair_idx % len(pairs)]
+                site = elements[(pair_idx // len(pairs)) % n_elements]
+                constituent_array = [[site]] * n_sublattices
+                constituent_array[pair_idx % n_sublattices] = list(pair)
+                value = temperature_piecewise(phase_idx + param_idx, n_intervals)
+                dbf.add_parameter("L", phase_name, constituent_array, order, value, force_insert=False)
+    dbf.process_parameter_queue()
+    return dbf
+
+
+def make_mqmqa_database(n_elements=4, n_phases=1, n_parameters=20, n_intervals=2):
+    """
+    Build a synthetic Database of MQMQA (modified quasichemical model in the quadruplet approximation) phases.
+
+    The first half of the elements form divalent cations and the rest divalent anions.
+
+    Parameters
+    ----------
+    n_elements : int
+        Number of pure elements, at least two.
+    n_phases : int
+        Number of phases.
+    n_parameters : int
+        Number of excess (MQMX) parameters per phase. Every phase also has MQMG
+        parameters for each cation-anion pair and MQMZ coordinations for each quadruplet.
+    n_intervals : int
+        Number of temperature intervals in each MQMG parameter value.
+
+    Returns
+    -------
+    Database
+    """
+    dbf = Database()
+    elements = _add_elements(dbf, n_elements, n_intervals)
+    n_cations = max(n_elements // 2, 1)
+    cations = [v.Species(f"{el}+2", {el: 1}, charge=2) for el in elements[:n_cations]]
+    anions = [v.Species(f"{el}-2", {el: 1}, charge=-2) for el in elements[n_cations:]]
+    dbf.species.update(cations + anions)
+    cation_pairs = list(itertools.combinations_with_replacement(cations, 2))
+    anion_pairs = list(itertools.combinations_with_replacement(anions, 2))
+    mixing_pairs = list(itertools.combinations(cations, 2)) or cation_pairs
+    for phase_idx in range(n_phases):
+        phase_name = f"LIQUID{phase_idx}"
+        chemical_groups = {"cations": {sp: 1 for sp in cations}, "anions": {sp: 1 for sp in anions}}
+        dbf.add_structure_entry(phase_name, phase_name)
+        dbf.add_phase(phase_name, {"mqmqa": {"type": "SUBQ", "chemical_groups": chemical_groups}}, [1.0])
+        dbf.add_phase_constituents(phase_name, [[sp.name for sp in cations], [sp.name for sp in anions]])
+        for idx, (cation, anion) in enumerate(itertools.product(cations, anions)):
+            value = temperature_piecewise(phase_idx + idx, n_intervals, reference=Symbol(f"GHSER{elements[0]}"))
+            dbf.add_parameter("MQMG", phase_name, [[cation.name], [anion.name]], None, value, force_insert=False,
+                              zeta=2.4, stoichiometry=[1.0, 1.0, 0.0, 0.0, 0.0])
+        for cation_pair, anion_pair in itertools.product(cation_pairs, anion_pairs):
+            dbf.add_parameter("MQMZ", phase_name, [[sp.name for sp in cation_pair], [sp.name for sp in anion_pair]],
+                              None, None, force_insert=False, coordinations=[6.0, 6.0, 6.0, 6.0])
+        for param_idx in range(n_parameters):
+            pair_idx, exponent = divmod(param_idx, 4)
+            cation_pair = mixing_pairs[pair_idx % len(mixing_pairs)]
+            anion = anions[(pair_idx // len(mixing_pairs)) % len(anions)]
+            value = -1000.5 * (param_idx + 1) + (param_idx % 3) * v.T
+            dbf.add_parameter("MQMX", phase_name, [[sp.name for sp in cation_pair], [anion.name, anion.name]],
+                              None, value, force_insert=False, mixing_code="G", exponents=[exponent, 0, 0, 0],
+                              additional_mixing_constituent=v.Species(None), additional_mixing_exponent=0)
+    dbf.process_parameter_queue()
+    return dbf
+
+
+def make_xml(model="CEF", **kwargs):
+    "XML string of a synthetic database built by `make_database` or, for `model=\"MQMQA\"`, `make_mqmqa_database`."
+    fd = StringIO()
+    write_xml(make_mqmqa_database(**kwargs) if model == "MQMQA" else make_database(**kwargs), fd)
+    return fd.getvalue()
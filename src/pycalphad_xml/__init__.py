@@ -1,3 +1,6 @@
 from pycalphad import Database
 from pycalphad_xml import parser
-Database.register_format("xml", read=parser.read_xml, write=parser.write_xml)
\ No newline at end of file
+Database.register_format("xml", read=parser.read_xml, write=parser.write_xml)
+# Compressed XML databases, e.g. Database("db.xml.gz")
+for compressed_format in ("gz", "bz2", "xz"):
+    Database.register_format(compressed_format, read=parser.read_xml, write=parser.write_xml)
\ No newline at end of file
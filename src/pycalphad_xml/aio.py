@@ -0,0 +1,168 @@
+"""
+Coroutines to read and write databases without blocking an asyncio event loop.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pycalphad import Database
+from pycalphad_xml.compression import infer_compression
+from pycalphad_xml.parser import read_xml, write_xml
+
+_default_executor = None
+
+
+def set_default_executor(executor):
+    """Set the executor that the coroutines run in when none is passed.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor or None
+        None to use the default executor of the event loop.
+    """
+    global _default_executor
+    _default_executor = executor
+
+
+async def _run(executor, func, *args, **kwargs):
+    # Run func in the executor. Cancelling the awaiting task stops func at the next call of its
+    # cancel_check, unless it runs in another process, where it can only be prevented from starting.
+    # A cancel_check given by the caller is still honoured.
+    executor = executor if executor is not None else _default_executor
+    cancelled = threading.Event()
+    if not isinstance(executor, ProcessPoolExecutor):
+        user_check = kwargs.get("cancel_check")
+        if user_check is None:
+            kwargs["cancel_check"] = cancelled.is_set
+        else:
+            kwargs["cancel_check"] = lambda: cancelled.is_set() or user_check()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+async def read_xml_async(dbf, fd, executor=None, **read_kwargs):
+    """Coroutine that reads an XML database into a Database object in an executor.
+
+    If the task awaiting it is cancelled, the read stops at the next phase or
+    expression and `dbf` is left partially read.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to add the data to.
+    fd : file-like
+        File descriptor to read from.
+    executor : concurrent.futures.ThreadPoolExecutor, optional
+        Executor to read in. Defaults to the one set with ``set_default_executor``,
+        or to the default executor of the event loop. `dbf` is modified in place,
+        so process pools are not supported.
+    read_kwargs :
+        Keyword arguments passed to ``read_xml``.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        The result of ``read_xml``.
+    """
+    if isinstance(executor or _default_executor, ProcessPoolExecutor):
+        raise ValueError("read_xml_async modifies the Database in place and cannot run in a process pool. "
+                         "Use load_database.")
+    return await _run(executor, read_xml, dbf, fd, **read_kwargs)
+
+
+async def write_xml_async(dbf, fd, executor=None, **write_kwargs):
+    """Coroutine that writes a Database object as XML in an executor.
+
+    If the task awaiting it is cancelled, the write stops at the next phase or
+    expression, leaving a partially written file if it was streaming.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to write. It must not be modified until the coroutine completes.
+    fd : file-like
+        File descriptor to write to.
+    executor : concurrent.futures.ThreadPoolExecutor, optional
+        Executor to write in, as for ``read_xml_async``.
+    write_kwargs :
+        Keyword arguments passed to ``write_xml``.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        The result of ``write_xml``.
+    """
+    if isinstance(executor or _default_executor, ProcessPoolExecutor):
+        raise ValueError("write_xml_async writes to a file object and cannot run in a process pool. Use save_database.")
+    return await _run(executor, write_xml, dbf, fd, **write_kwargs)
+
+
+def _load(path, **read_kwargs):
+    dbf = Database()
+    with open(path) as fd:
+        read_xml(dbf, fd, **read_kwargs)
+    return dbf
+
+
+def _save(dbf, path, **write_kwargs):
+    # Write to a temporary file that replaces the destination once complete,
+    # so a cancelled or failed write leaves no partial file.
+    write_kwargs.setdefault("compression", infer_compression(os.fspath(path)))
+    tmp_path = f"{os.fspath(path)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w") as fd:
+            write_xml(dbf, fd, **write_kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def load_database(path, executor=None, **read_kwargs):
+    """Coroutine that opens and reads an XML database file into a new Database.
+
+    Several databases can be loaded concurrently, e.g. with ``asyncio.gather``,
+    up to the number of workers of the executor.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        XML database file, optionally compressed.
+    executor : concurrent.futures.Executor, optional
+        Executor to read in. Defaults to the one set with ``set_default_executor``,
+        or to the default executor of the event loop. In a process pool, the
+        Database is pickled back to the calling process and cancellation only
+        prevents reads that have not started.
+    read_kwargs :
+        Keyword arguments passed to ``read_xml``.
+
+    Returns
+    -------
+    Database
+    """
+    return await _run(executor, _load, path, **read_kwargs)
+
+
+async def save_database(dbf, path, executor=None, **write_kwargs):
+    """Coroutine that writes a Database to an XML file.
+
+    The file is replaced once it is completely written, so cancelling the
+    task awaiting it leaves any existing file unchanged.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to write. It must not be modified until the coroutine completes.
+    path : str or PathLike
+        XML file to write. The compression is inferred from its extension unless
+        ``compression`` is given.
+    executor : concurrent.futures.Executor, optional
+        Executor to write in, as for ``load_database``.
+    write_kwargs :
+        Keyword arguments passed to ``write_xml``.
+    """
+    await _run(executor, _save, dbf, path, **write_kwargs)
@@ -0,0 +1,230 @@
+"""
+Persistent on-disk cache of Databases read from XML.
+"""
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from symengine import Basic
+from importlib.metadata import version, PackageNotFoundError
+from pycalphad import Database
+from pycalphad import __version__ as pycalphad_version
+from pycalphad_xml.parser import file_fingerprint, read_xml
+from pycalphad_xml.stats import NULL_STATS
+import logging
+logger = logging.getLogger(__name__)
+
+try:
+    pycalphad_xml_version = version("pycalphad-xml")
+except PackageNotFoundError:
+    pycalphad_xml_version = "unknown"
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("PYCALPHAD_XML_CACHE_DIR", Path.home() / ".cache" / "pycalphad-xml"))
+DEFAULT_CACHE_SIZE = 1024**3  # bytes
+_CACHE_SUFFIX = ".pickle"
+
+
+def cache_key(data, **read_kwargs):
+    """Return the cache key for database file contents and the keyword arguments it is read with.
+
+    Parameters
+    ----------
+    data : bytes
+        Contents of the database file.
+    read_kwargs :
+        Keyword arguments to ``read_xml`` that affect the resulting Database.
+
+    Returns
+    -------
+    str
+    """
+    hasher = hashlib.sha256()
+    hasher.update(data)
+    hasher.update(f"pycalphad {pycalphad_version}\0pycalphad-xml {pycalphad_xml_version}\0".encode())
+    for key, value in sorted(read_kwargs.items()):
+        if value is not None:
+            value = sorted(value) if isinstance(value, (set, frozenset, list, tuple)) else value
+            hasher.update(f"{key}={value!r}\0".encode())
+    return hasher.hexdigest()
+
+
+class _ExpressionPickler(pickle.Pickler):
+    # Pickle each distinct SymEngine expression once. Databases repeat the same
+    # expressions many times and their serialization dominates the cost of pickling.
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.expressions = []
+        self.expression_ids = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, Basic):
+            return None
+        key = (type(obj), obj)
+        expression_id = self.expression_ids.get(key)
+        if expression_id is None:
+            expression_id = self.expression_ids[key] = len(self.expressions)
+            self.expressions.append(obj)
+        return expression_id
+
+
+class _ExpressionUnpickler(pickle.Unpickler):
+    def __init__(self, file, expressions):
+        super().__init__(file)
+        self.expressions = expressions
+
+    def persistent_load(self, expression_id):
+        return self.expressions[expression_id]
+
+
+def _dumps(state):
+    state_fd = io.BytesIO()
+    pickler = _ExpressionPickler(state_fd)
+    pickler.dump(state)
+    return pickle.dumps((pickler.expressions, state_fd.getvalue()), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(fd):
+    expressions, state_data = pickle.load(fd)
+    return _ExpressionUnpickler(io.BytesIO(state_data), expressions).load()
+
+
+def _load(path):
+    try:
+        with open(path, "rb") as fd:
+            state = _loads(fd)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Truncated or stale entries are treated as misses and replaced
+        logger.warning("Discarding unreadable database cache entry %s", path, exc_info=True)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    try:
+        # Mark as recently used for eviction
+        os.utime(path)
+    except OSError:
+        pass
+    return state
+
+
+def _store(path, state):
+    # Write to a temporary file in the same directory and atomically move it into place,
+    # so concurrent readers never see a partially written entry.
+    data = _dumps(state)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.stem, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_fd:
+            tmp_fd.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def evict(cache_dir=None, max_size=DEFAULT_CACHE_SIZE):
+    """Remove the least recently used entries until the cache is at most `max_size` bytes.
+
+    Entries removed concurrently by other processes are ignored.
+
+    Parameters
+    ----------
+    cache_dir : str or Path, optional
+        Cache directory. Defaults to ``DEFAULT_CACHE_DIR``.
+    max_size : int, optional
+        Maximum total size of the cache entries, in bytes.
+    """
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    entries = []
+    for path in cache_dir.glob("*" + _CACHE_SUFFIX):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def clear(cache_dir=None):
+    """Remove all entries from the cache."""
+    evict(cache_dir, max_size=0)
+
+
+def read_xml_cached(dbf, fd, cache_dir=None, max_size=DEFAULT_CACHE_SIZE, **read_kwargs):
+    """Read an XML database, reusing the Database built by a previous read of the same contents.
+
+    Entries are keyed by a hash of the file contents, the pycalphad and
+    pycalphad-xml versions and the keyword arguments to ``read_xml``. They hold
+    the fully built Database in pickle format. Entries are written atomically
+    and the cache can be shared by several processes. To use the cache for all
+    XML databases, register it as the reader::
+
+        from functools import partial
+        Database.register_format("xml", read=partial(read_xml_cached, cache_dir="/path/to/cache"), write=write_xml)
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to add the data to. The cache is only used if it is empty.
+    fd : file-like
+        File descriptor to read from.
+    cache_dir : str or Path, optional
+        Cache directory. Defaults to ``DEFAULT_CACHE_DIR``.
+    max_size : int, optional
+        Maximum total size of the cache entries, in bytes. The least recently
+        used entries are removed after a new entry is written.
+    read_kwargs :
+        Keyword arguments passed to ``read_xml``. Cached Databases are fully
+        converted, so ``lazy=True`` is not supported. On a cache hit, a ``stats``
+        collector records the ``"load_cache"`` stage and a ``"cache_hits"`` count,
+        and a ``fingerprint`` collector is computed from the file contents.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        Result of ``read_xml``. None if the Database was loaded from the cache.
+    """
+    if read_kwargs.get("lazy", False):
+        raise ValueError("Cached Databases are fully converted, lazy reads are not supported by read_xml_cached")
+    read_kwargs.pop("lazy", None)
+    # Read compressed files as they are, read_xml decompresses them
+    data = fd.buffer.read() if isinstance(fd, io.TextIOBase) and hasattr(fd, "buffer") else fd.read()
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if dbf != Database():
+        return read_xml(dbf, io.BytesIO(data), **read_kwargs)
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / (cache_key(data, **{k: v for k, v in read_kwargs.items() if k in ("elements", "phases")}) + _CACHE_SUFFIX)
+
+    stats = read_kwargs.get("stats")
+    stats = stats if stats is not None else NULL_STATS
+    with stats.stage("load_cache"):
+        state = _load(path)
+    if state is not None:
+        dbf.__setstate__(state)
+        stats.count("cache_hits")
+        fingerprint = read_kwargs.get("fingerprint")
+        if fingerprint is not None:
+            with stats.stage("fingerprint"):
+                file_fingerprint(io.BytesIO(data), fingerprint)
+        return None
+    result = read_xml(dbf, io.BytesIO(data), **read_kwargs)
+    _store(path, dbf.__getstate__())
+    evict(cache_dir, max_size)
+    return result
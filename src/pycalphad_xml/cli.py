@@ -0,0 +1,242 @@
+"""
+The ``pycalphad-xml`` command line tool.
+"""
+import argparse
+import json
+import os
+import sys
+import traceback
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+from lxml import etree
+from pycalphad import Database
+from pycalphad_xml import index
+from pycalphad_xml.index import file_hash
+from pycalphad_xml.compression import COMPRESSION_FORMATS
+from pycalphad_xml.parser import database_fingerprint, file_fingerprint
+
+# Extensions of the databases that are converted when a directory is given
+SOURCE_EXTENSIONS = (".tdb", ".dat")
+DEFAULT_MANIFEST_NAME = ".pycalphad-xml-convert.json"
+
+ConversionResult = namedtuple('ConversionResult', ['source', 'output', 'status', 'seconds', 'error'])
+
+
+def find_sources(paths):
+    "Database files to convert: the given files, and the files with a ``SOURCE_EXTENSIONS`` extension in the given directories."
+    sources = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources.extend((path, source) for source in sorted(path.rglob("*"))
+                           if source.is_file() and source.suffix.lower() in SOURCE_EXTENSIONS)
+        else:
+            sources.append((path.parent, path))
+    return sources
+
+
+def output_path(root, source, output_dir=None, compression=None):
+    "Path of the XML file that `source`, found under `root`, is converted to."
+    suffix = ".xml" + (COMPRESSION_FORMATS[compression].extension if compression is not None else "")
+    if output_dir is None:
+        return source.with_suffix(suffix)
+    return Path(output_dir) / source.relative_to(root).with_suffix(suffix)
+
+
+def is_up_to_date(source, output, manifest=None, source_hash=None):
+    """Whether `output` was converted from the current contents of `source`.
+
+    If `manifest`, a map of absolute output paths to the hash of the source they
+    were converted from, is given, the hashes are compared. Otherwise the output
+    is up to date if it is newer than the source.
+    """
+    if not output.exists():
+        return False
+    if manifest is not None:
+        return manifest.get(str(output.resolve())) == (source_hash or file_hash(source))
+    return output.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+
+def _summary(dbf):
+    # Contents that a converted database must have in common with the source
+    return (sorted(dbf.elements), sorted(sp.name for sp in dbf.species), sorted(dbf.phases),
+            sorted(dbf.symbols), len(dbf._parameters))
+
+
+def _output_fingerprint(output):
+    # Fingerprint of an existing output, or None if it does not exist or is not a database
+    try:
+        with open(output, "rb") as fd:
+            return file_fingerprint(fd)
+    except (FileNotFoundError, etree.XMLSyntaxError):
+        return None
+
+
+def convert_file(source, output, verify=False, skip_unchanged=False):
+    """Convert a database to XML and optionally check that the result reads back.
+
+    The output is written to a temporary file in the same directory and moved
+    into place once complete. The format of the source and any compression of
+    the output are determined from the file extensions.
+
+    Parameters
+    ----------
+    source : Path
+        Database file in any format pycalphad can read.
+    output : Path
+        XML file to write.
+    verify : bool, optional
+        If True, read the output back and compare its elements, species,
+        phases, symbol names and number of parameters with the source.
+    skip_unchanged : bool, optional
+        If True, leave an existing output untouched, with the status
+        ``"unchanged"``, if its fingerprint is that of the converted database.
+
+    Returns
+    -------
+    ConversionResult
+        Failures are reported in the result instead of raised.
+    """
+    start = perf_counter()
+    tmp_output = output.with_name(f".tmp-{os.getpid()}-{output.name}")
+    try:
+        dbf = Database(str(source))
+        if skip_unchanged and _output_fingerprint(output) == database_fingerprint(dbf):
+            return ConversionResult(source, output, "unchanged", perf_counter() - start, None)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        dbf.to_file(str(tmp_output), if_exists="overwrite")
+        if verify and _summary(Database(str(tmp_output))) != _summary(dbf):
+            raise ValueError("The converted database does not read back to the same contents")
+        os.replace(tmp_output, output)
+    except Exception as e:
+        if tmp_output.exists():
+            tmp_output.unlink()
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        return ConversionResult(source, output, "failed", perf_counter() - start, error)
+    return ConversionResult(source, output, "converted", perf_counter() - start, None)
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as fd:
+            return json.load(fd)
+    except FileNotFoundError:
+        return {}
+
+
+def _store_manifest(path, manifest):
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w") as fd:
+        json.dump(manifest, fd, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def convert(options, out=None):
+    "Run the ``convert`` command, reporting to `out` (default: standard output). Returns the exit status."
+    out = out if out is not None else sys.stdout
+    start = perf_counter()
+    manifest_path = None
+    manifest = None
+    # Unchanged outputs keep their modification time, so they can only be found up to date by hash
+    check = options.check or ("hash" if options.skip_unchanged else "mtime")
+    if check == "hash":
+        manifest_path = Path(options.manifest or Path(options.output_dir or ".") / DEFAULT_MANIFEST_NAME)
+        manifest = _load_manifest(manifest_path)
+    results = []
+    jobs = []
+    source_hashes = {}  # recorded in the manifest once converted
+    conversions = [(source, output_path(root, source, options.output_dir, options.compression))
+                   for root, source in find_sources(options.paths)]
+    # Sources converted to the same output, e.g. foo.tdb and foo.dat, would overwrite each other
+    sources_by_output = defaultdict(list)
+    for source, output in conversions:
+        sources_by_output[output.resolve()].append(source)
+    duplicates = []
+    for source, output in conversions:
+        other_sources = [other for other in sources_by_output[output.resolve()] if other != source]
+        if other_sources:
+            error = f"{output} is also the output of {', '.join(map(str, other_sources))}"
+            duplicates.append(ConversionResult(source, output, "failed", 0.0, error))
+            continue
+        if manifest is not None:
+            source_hashes[source] = file_hash(source)
+        if not options.force and is_up_to_date(source, output, manifest, source_hashes.get(source)):
+            results.append(ConversionResult(source, output, "skipped", 0.0, None))
+        else:
+            jobs.append((source, output))
+
+    def report(result):
+        results.append(result)
+        print(f"{result.status:<9} {result.seconds:8.3f} s  {result.source} -> {result.output}", file=out)
+        if result.error is not None:
+            print(f"          {result.error}", file=out)
+        if result.status in ("converted", "unchanged") and manifest is not None:
+            manifest[str(result.output.resolve())] = source_hashes[result.source]
+            _store_manifest(manifest_path, manifest)
+
+    for result in duplicates:
+        report(result)
+    if options.workers is not None and options.workers > 1:
+        with ProcessPoolExecutor(max_workers=options.workers) as executor:
+            futures = [executor.submit(convert_file, source, output, options.verify, options.skip_unchanged) for source, output in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+    else:
+        for source, output in jobs:
+            report(convert_file(source, output, options.verify, options.skip_unchanged))
+
+    counts = {status: sum(result.status == status for result in results)
+              for status in ("converted", "unchanged", "skipped", "failed")}
+    print("{converted} converted, ".format(**counts)
+          + ("{unchanged} unchanged, ".format(**counts) if options.skip_unchanged else "")
+          + "{skipped} up to date, {failed} failed".format(**counts)
+          + f" in {perf_counter() - start:.3f} s", file=out)
+    for result in results:
+        if result.status == "failed":
+            print(f"failed: {result.source}", file=out)
+    return 1 if counts["failed"] > 0 else 0
+
+
+def main(args=None):
+    """Entry point of the ``pycalphad-xml`` command. Returns the exit status."""
+    parser = argparse.ArgumentParser(prog="pycalphad-xml", description="Tools for XML thermodynamic databases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser(
+        "convert", help="convert TDB, DAT and other databases to XML",
+        description="Convert database files, and the TDB and DAT files in directory trees, to XML.")
+    convert_parser.add_argument("paths", nargs="+", help="database files or directories to convert")
+    convert_parser.add_argument("-o", "--output-dir", help="directory to write the XML files to, mirroring the "
+                                "layout of the source directories. Defaults to next to each source")
+    convert_parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                                help="number of worker processes (default: number of CPUs)")
+    convert_parser.add_argument("--check", choices=["mtime", "hash"],
+                                help="how to detect outputs that are up to date: newer than the source, or "
+                                "converted from a source with the same hash as recorded in the manifest "
+                                "(default: mtime, or hash with --skip-unchanged)")
+    convert_parser.add_argument("--manifest", help=f"manifest of source hashes for --check=hash "
+                                f"(default: {DEFAULT_MANIFEST_NAME} in the output directory)")
+    convert_parser.add_argument("--force", action="store_true", help="convert all files, even if up to date")
+    convert_parser.add_argument("--skip-unchanged", action="store_true",
+                                help="leave outputs whose contents would not change untouched, "
+                                "by comparing the fingerprints of the converted and existing databases. "
+                                "Requires --check hash, the default with this option")
+    convert_parser.add_argument("--verify", action="store_true", help="read each output back and compare it with the source")
+    convert_parser.add_argument("--compression", choices=sorted(COMPRESSION_FORMATS), help="compress the XML files")
+
+    index_parser = commands.add_parser("index", help="build the byte offset index of XML databases",
+                                       description="Build the byte offset index of XML databases.")
+    index_parser.add_argument("paths", nargs="+", help="XML database files to index")
+    index_parser.add_argument("--force", action="store_true", help="rebuild indexes that are up to date")
+
+    options = parser.parse_args(args)
+    if options.command == "convert":
+        if options.skip_unchanged and options.check == "mtime":
+            convert_parser.error("--skip-unchanged requires --check hash: unchanged outputs stay older than their sources")
+        return convert(options)
+    return index.index_files(options.paths, options.force)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
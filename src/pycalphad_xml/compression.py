@@ -0,0 +1,118 @@
+"""
+Transparent compression of database files with the standard library codecs.
+"""
+import bz2
+import gzip
+import io
+import lzma
+from collections import namedtuple
+from contextlib import contextmanager
+
+CompressionFormat = namedtuple('CompressionFormat', ['magic', 'extension', 'open'])
+
+COMPRESSION_FORMATS = {
+    # mtime=0 so that writing the same database twice produces identical files
+    "gzip": CompressionFormat(b"\x1f\x8b", ".gz", lambda fd, mode: gzip.GzipFile(fileobj=fd, mode=mode, mtime=0)),
+    "bz2": CompressionFormat(b"BZh", ".bz2", lambda fd, mode: bz2.BZ2File(fd, mode=mode)),
+    "xz": CompressionFormat(b"\xfd7zXZ\x00", ".xz", lambda fd, mode: lzma.LZMAFile(fd, mode=mode)),
+}
+_MAGIC_SIZE = max(len(fmt.magic) for fmt in COMPRESSION_FORMATS.values())
+
+
+def _binary_stream(fd):
+    # Binary file underlying `fd`, or None if it has none (e.g. StringIO)
+    if isinstance(fd, io.TextIOBase):
+        return getattr(fd, "buffer", None)
+    return fd
+
+
+def _peek(fd, size):
+    # Read the first bytes of a binary file without consuming them
+    if hasattr(fd, "peek"):
+        return fd.peek(size)[:size]
+    if fd.seekable():
+        position = fd.tell()
+        data = fd.read(size)
+        fd.seek(position)
+        return data
+    return b""
+
+
+def detect_compression(fd):
+    """Compression format of a file from its magic bytes, without consuming any data.
+
+    Parameters
+    ----------
+    fd : file-like
+        File descriptor open for reading.
+
+    Returns
+    -------
+    str or None
+        Name of the compression format, one of the keys of ``COMPRESSION_FORMATS``, or None if uncompressed.
+    """
+    binary_fd = _binary_stream(fd)
+    if binary_fd is None:
+        return None
+    magic = _peek(binary_fd, _MAGIC_SIZE)
+    if isinstance(magic, str):
+        return None
+    for name, fmt in COMPRESSION_FORMATS.items():
+        if magic.startswith(fmt.magic):
+            return name
+    return None
+
+
+def infer_compression(path):
+    """Compression format of a file from its extension, or None if uncompressed or unknown."""
+    if not isinstance(path, str):
+        return None
+    for name, fmt in COMPRESSION_FORMATS.items():
+        if path.lower().endswith(fmt.extension):
+            return name
+    return None
+
+
+def open_decompressed(fd):
+    """File to read the uncompressed contents of `fd` from.
+
+    Returns a decompressing binary file if `fd` is compressed and `fd` itself
+    otherwise. Data is decompressed incrementally as it is read.
+    """
+    compression = detect_compression(fd)
+    if compression is None:
+        return fd
+    return COMPRESSION_FORMATS[compression].open(_binary_stream(fd), "rb")
+
+
+@contextmanager
+def open_compressed(fd, compression):
+    """Context manager for a text file that compresses everything written to it into `fd`.
+
+    Parameters
+    ----------
+    fd : file-like
+        Binary file, or text file backed by a binary file, open for writing.
+        It is not closed on exit.
+    compression : str
+        Name of the compression format, one of the keys of ``COMPRESSION_FORMATS``.
+
+    Yields
+    ------
+    io.TextIOWrapper
+    """
+    if compression not in COMPRESSION_FORMATS:
+        raise ValueError(f"Unknown compression {compression!r}. Expected one of {tuple(COMPRESSION_FORMATS)}")
+    binary_fd = _binary_stream(fd)
+    if binary_fd is None:
+        raise ValueError(f"Writing {compression} compressed data requires a binary file, got {type(fd).__name__}")
+    if binary_fd is not fd:
+        fd.flush()
+    compressed_fd = COMPRESSION_FORMATS[compression].open(binary_fd, "wb")
+    text_fd = io.TextIOWrapper(compressed_fd, encoding="utf-8", newline="")
+    try:
+        yield text_fd
+        text_fd.flush()
+    finally:
+        text_fd.detach()
+        compressed_fd.close()
@@ -0,0 +1,84 @@
+"""
+Canonical fingerprints of the contents of databases.
+"""
+import hashlib
+from lxml import etree
+
+
+def _canonical(node):
+    # Canonical XML, with sorted attributes and without comments, and with normalized whitespace:
+    # runs of whitespace become one space, which still separates the numbers of lists such as
+    # Coordinations, and is then removed next to tags, i.e. indentation and the ends of texts.
+    # Canonical XML escapes "<" and ">" in text, so these only match at tags.
+    data = b" ".join(etree.tostring(node, method="c14n", with_comments=False).split())
+    return data.replace(b"> ", b">").replace(b" <", b"<")
+
+
+def node_digest(node):
+    """SHA-256 digest of the canonical form of a top-level node of a database.
+
+    The parameters of a Phase are hashed in sorted order, so that their order
+    in the document does not change the digest.
+
+    Parameters
+    ----------
+    node : lxml.etree._Element
+        ChemicalElement, Species, Expr or Phase node.
+
+    Returns
+    -------
+    bytes
+    """
+    if node.tag != "Phase":
+        return hashlib.sha256(_canonical(node)).digest()
+    digest = hashlib.sha256(b"Phase\0" + node.get("id", "").encode("utf-8") + b"\0")
+    parameters = []
+    for child in node.iterchildren(tag=etree.Element):
+        if child.tag == "Parameter":
+            parameters.append(_canonical(child))
+        else:
+            digest.update(_canonical(child))
+    digest.update(b"\0")
+    for parameter in sorted(parameters):
+        digest.update(parameter)
+    return digest.digest()
+
+
+class Fingerprint(object):
+    """Canonical hash of the elements, species, symbols, phases with their models and parameters of a database.
+
+    Pass an instance as ``fingerprint=`` to ``read_xml`` or ``write_xml`` to
+    compute the fingerprint of the database read or written, at the cost of
+    hashing each top-level node once. The fingerprint does not depend on
+    metadata such as the writer version, on whitespace and comments, or on the
+    order of the top-level nodes and of the parameters of each phase, so files
+    written by ``write_xml`` from an equal Database have the same fingerprint.
+    It is a hash of the XML rather than of the database it reads to: files
+    that write values or expressions differently, e.g. ``mass="1"`` and
+    ``mass="1.0"``, have different fingerprints.
+    """
+    def __init__(self):
+        self._digests = []
+
+    def update(self, node):
+        "Add a top-level node of a database. Metadata, comments and processing instructions are ignored."
+        if isinstance(node.tag, str) and node.tag != "metadata":
+            self._digests.append(node_digest(node))
+
+    def update_digest(self, digest):
+        "Add the ``node_digest`` of a top-level node."
+        self._digests.append(digest)
+
+    def merge(self, other):
+        "Add the nodes of another fingerprint."
+        self._digests.extend(other._digests)
+
+    def hexdigest(self):
+        "SHA-256 hex digest of the nodes added so far."
+        digest = hashlib.sha256()
+        for item in sorted(self._digests):
+            digest.update(item)
+        return digest.hexdigest()
+
+    def __repr__(self):
+        return f"Fingerprint({self.hexdigest()!r})"
@@ -0,0 +1,298 @@
+"""
+Byte offset index of the top-level elements of a database file, to load selected phases without parsing the whole file.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from lxml import etree
+from pycalphad_xml.compression import COMPRESSION_FORMATS
+from pycalphad_xml.parser import (
+    LazyParameterDocument, LazySymbols, ParseContext, add_phase_data, close_phase_selection, disordered_parts,
+    expr_identifiers, parse_chemical_element, parse_expr, parse_phase_data, parse_species, referenced_expr_names,
+)
+from pycalphad_xml.stats import NULL_STATS
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".index.json"
+
+IndexEntry = namedtuple('IndexEntry', ['tag', 'id', 'start', 'end', 'refs'])
+
+# Markup of the document: comments, CDATA sections, processing instructions and
+# DOCTYPE declarations are skipped, tags capture (closing slash, name, attributes, self-closing slash).
+# Attribute values are matched as a whole because they may contain '>'.
+_markup = re.compile(rb'''
+    <!--.*?-->
+  | <!\[CDATA\[.*?\]\]>
+  | <\?.*?\?>
+  | <!DOCTYPE[^>]*>
+  | <(/?)([^\s/>]+)((?:[^>"']|"[^"]*"|'[^']*')*?)(/?)>
+''', re.DOTALL | re.VERBOSE)
+_id_attribute = re.compile(rb'''\sid\s*=\s*(?:"([^"]*)"|'([^']*)')''')
+_HASH_CHUNK_SIZE = 1024**2
+
+
+def default_index_path(path):
+    "Path of the index file of the database at `path`."
+    return os.fspath(path) + INDEX_SUFFIX
+
+
+def file_hash(path):
+    "SHA-256 hex digest of the contents of a file."
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _scan_root_children(data):
+    # Yield (tag, id, start, end) of each child of the root element, in document order
+    depth = 0
+    current = None
+    for match in _markup.finditer(data):
+        closing, name, attributes, self_closing = match.groups()
+        if name is None:
+            continue
+        if closing:
+            depth -= 1
+            if depth == 1 and current is not None:
+                yield current + (match.end(),)
+                current = None
+            continue
+        if depth == 1:
+            id_match = _id_attribute.search(attributes)
+            element_id = None if id_match is None else (id_match.group(1) or id_match.group(2) or b"").decode("utf-8")
+            current = (name.decode("utf-8"), element_id, match.start())
+        if self_closing:
+            if depth == 1:
+                yield current + (match.end(),)
+                current = None
+        else:
+            depth += 1
+    if depth != 0:
+        raise ValueError("Unbalanced tags, the file is not a well-formed XML document")
+
+
+def build_index(path, index_path=None):
+    """Scan a database file for the byte range of each top-level element and write the index file.
+
+    The index records the size, modification time and SHA-256 hash of the file,
+    the tag, id and byte range of each child of the Database element and, for
+    each Expr, the identifiers in its value. For each Phase with an
+    AtomicOrdering, it records the map of ordered to disordered phase names,
+    so that selecting an ordered phase also loads its disordered part.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        Uncompressed XML database file.
+    index_path : str or PathLike, optional
+        Index file to write. Defaults to the database path with ``INDEX_SUFFIX`` appended.
+
+    Returns
+    -------
+    dict
+        The index that was written.
+    """
+    stat = os.stat(path)
+    with open(path, "rb") as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if any(data[:len(fmt.magic)] == fmt.magic for fmt in COMPRESSION_FORMATS.values()):
+            raise ValueError(f"Cannot index compressed file {os.fspath(path)!r}")
+        parser = etree.XMLParser(load_dtd=False, no_network=True)
+        entries = []
+        for tag, element_id, start, end in _scan_root_children(data):
+            refs = None
+            if tag == 'Expr':
+                refs = expr_identifiers(etree.fromstring(data[start:end], parser=parser))
+            elif tag == 'Phase' and data.find(b"AtomicOrdering", start, end) != -1:
+                refs = disordered_parts([etree.fromstring(data[start:end], parser=parser)]) or None
+            entries.append([tag, element_id, start, end, refs])
+    index = {
+        "version": INDEX_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_hash(path),
+        "entries": entries,
+    }
+    # Write to a unique temporary file and move it into place, so that processes
+    # rebuilding the same index concurrently never replace each other's files.
+    index_path = os.fspath(index_path or default_index_path(path))
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path) or ".",
+                                    prefix=os.path.basename(index_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as tmp_fd:
+            json.dump(index, tmp_fd)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return index
+
+
+def load_index(path, index_path=None, verify=False):
+    """Read the index file of a database, if it is up to date.
+
+    By default, an index is considered up to date if the size and modification
+    time of the database file match the ones recorded in the index, which takes
+    the same time for any file size. With ``verify=True`` the hash of the
+    contents must match as well.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        Database file.
+    index_path : str or PathLike, optional
+        Index file. Defaults to the database path with ``INDEX_SUFFIX`` appended.
+    verify : bool, optional
+        If True, also compare the SHA-256 hash of the database file.
+
+    Returns
+    -------
+    dict or None
+        None if the index is missing, unreadable or out of date.
+    """
+    try:
+        with open(index_path or default_index_path(path)) as fd:
+            index = json.load(fd)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(path)
+    if (index.get("version") != INDEX_VERSION or index.get("size") != stat.st_size
+            or index.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    if verify and index.get("sha256") != file_hash(path):
+        return None
+    return index
+
+
+def read_xml_indexed(dbf, path, phases, elements=None, index_path=None, verify=False, lazy=False, stats=None):
+    """Read selected phases of an XML database using its index file.
+
+    Only the ChemicalElement and Species elements, the requested Phase elements
+    along with the disordered parts of the requested ordered phases, and the
+    Expr elements their parameters refer to are parsed. They are sliced out of
+    the memory mapped file using the byte ranges in the index, so the time to
+    load a phase does not depend on the size of the file. The index is
+    (re)built if it is missing or out of date, which requires a full scan.
+    The file is not validated against the schema.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to add the data to.
+    path : str or PathLike
+        Uncompressed XML database file.
+    phases : list of str
+        Phases to load.
+    elements : list of str, optional
+        Only load parameters whose constituents are made of these elements, as in ``read_xml``.
+    index_path : str or PathLike, optional
+        Index file. Defaults to the database path with ``INDEX_SUFFIX`` appended.
+    verify : bool, optional
+        If True, check the hash of the file contents before using an existing index.
+    lazy : bool, optional
+        If True, defer the conversion of symbols and parameter values, as in ``read_xml``.
+    stats : Stats, optional
+        Collector of timings and counts, as in ``read_xml``.
+    """
+    stats = stats if stats is not None else NULL_STATS
+    with stats.stage("index"):
+        index = load_index(path, index_path, verify=verify)
+        if index is None:
+            index = build_index(path, index_path)
+    entries = [IndexEntry(*entry) for entry in index["entries"]]
+    parts = {}
+    for entry in entries:
+        if entry.tag == 'Phase' and entry.refs is not None:
+            parts.update(entry.refs)
+    phases = close_phase_selection(phases, parts)
+    if elements is not None:
+        elements = frozenset(str(el).upper() for el in elements)
+    if lazy:
+        if not isinstance(dbf.symbols, LazySymbols):
+            dbf.symbols = LazySymbols(dbf.symbols)
+        dbf._parameters.table(dbf._parameters.default_table_name).document_class = LazyParameterDocument
+    context = ParseContext(dbf.species, phases=phases, elements=elements, lazy=lazy, stats=stats)
+    parser = etree.XMLParser(load_dtd=False, no_network=True)
+
+    with open(path, "rb") as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        def parse_fragment(entry):
+            return etree.fromstring(data[entry.start:entry.end], parser=parser)
+
+        with stats.stage("parse"):
+            for entry in entries:
+                if entry.tag == 'ChemicalElement':
+                    context.add_species((parse_chemical_element(dbf, parse_fragment(entry)),))
+                    stats.count("elements")
+                elif entry.tag == 'Species':
+                    context.add_species((parse_species(dbf, parse_fragment(entry)),))
+                    stats.count("species")
+        for entry in entries:
+            if entry.tag == 'Phase' and entry.id in phases:
+                with stats.stage("phases"):
+                    phase_data = parse_phase_data(context, parse_fragment(entry))
+                if phase_data is not None:
+                    with stats.stage("add_parameter"):
+                        add_phase_data(dbf, phase_data)
+        with stats.stage("exprs"):
+            expr_entries = [entry for entry in entries if entry.tag == 'Expr']
+            referenced = referenced_expr_names(dbf, {entry.id: entry.refs for entry in expr_entries})
+            for entry in expr_entries:
+                if entry.id in referenced:
+                    parse_expr(dbf, parse_fragment(entry), lazy=lazy, stats=stats)
+    with stats.stage("process_parameter_queue"):
+        dbf.process_parameter_queue()
+
+
+def index_files(paths, force=False, out=None):
+    """Build the index of each database file that has none or whose index is out of date.
+
+    Parameters
+    ----------
+    paths : list of str or PathLike
+        XML database files.
+    force : bool, optional
+        If True, rebuild indexes that are up to date.
+    out : file-like, optional
+        Where to report each file. Defaults to standard output.
+
+    Returns
+    -------
+    int
+        Exit status: 1 if any file could not be indexed, 0 otherwise.
+    """
+    out = out if out is not None else sys.stdout
+    status = 0
+    for path in paths:
+        try:
+            if force or load_index(path, verify=True) is None:
+                index = build_index(path)
+                print(f"{path}: indexed {len(index['entries'])} elements", file=out)
+            else:
+                print(f"{path}: index is up to date", file=out)
+        except (OSError, ValueError) as e:
+            print(f"{path}: failed: {e}", file=out)
+            status = 1
+    return status
+
+
+def main(args=None):
+    "Entry point of ``python -m pycalphad_xml.index``. Returns the exit status."
+    parser = argparse.ArgumentParser(description="Build the byte offset index of XML database files.")
+    parser.add_argument("paths", nargs="+", help="XML database files to index")
+    parser.add_argument("--force", action="store_true", help="rebuild indexes that are up to date")
+    options = parser.parse_args(args)
+    return index_files(options.paths, options.force)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
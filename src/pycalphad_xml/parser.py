@@ -1,39 +1,248 @@
-from pycalphad.io.tdb import _sympify_string, _process_reference_state, to_interval
+from pycalphad.io.tdb import _sympify_string, _process_reference_state, to_interval, get_supported_variables
 from pycalphad import variables as v
 from pycalphad import __version__ as pycalphad_version
-from symengine import Piecewise, And, Symbol, S
+from symengine import Basic, Piecewise, And, Symbol, S, Add, Pow, RealDouble, log
 from lxml import etree, objectify
+from tinydb.table import Document
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter, namedtuple
+from copy import deepcopy
+from functools import lru_cache
+import threading
+import codecs
+import io
+import re
 import logging
 logger = logging.getLogger(__name__)
 
 # Workaround so this can be imported from other working directory.
 # We should use importlib.resources, etc. to package up and refer to schemas.
 from pathlib import Path
+from pycalphad_xml.compression import infer_compression, open_compressed, open_decompressed
+from pycalphad_xml.fingerprint import Fingerprint, node_digest
+from pycalphad_xml.stats import NULL_STATS, Stats
 this_dir = Path(__file__).parent
 
+VALIDATION_MODES = ("strict", "warn", "off", "deferred")
 
-def convert_math_to_symbolic(math_nodes):
-    result = 0.0
-    interval_nodes = [x for x in math_nodes if (not isinstance(x, str)) and x.tag == 'Interval']
-    string_nodes = [x for x in math_nodes if isinstance(x, str)]
-    for math_node in string_nodes:
-        # +0 is a hack, for how the function works
-        result += _sympify_string(math_node+'+0')
-    result += convert_intervals_to_piecewise(interval_nodes)
-    result = result.xreplace({Symbol('T'): v.T, Symbol('P'): v.P})
+_relaxng = None
+_relaxng_lock = threading.Lock()
+# lxml validators keep their error log on the validator object, so concurrent
+# validations against the shared schema must be serialized.
+_validation_lock = threading.Lock()
+_validation_executor = None
+
+
+def _get_relaxng():
+    """Return the compiled database schema, building it once per process on first use."""
+    global _relaxng
+    if _relaxng is None:
+        with _relaxng_lock:
+            if _relaxng is None:
+                _relaxng = etree.RelaxNG(etree.parse(str(this_dir / 'database.rng')))
+    return _relaxng
+
+
+def _get_validation_executor():
+    global _validation_executor
+    if _validation_executor is None:
+        with _relaxng_lock:
+            if _validation_executor is None:
+                _validation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pycalphad_xml-validate')
+    return _validation_executor
+
+
+def _validate_tree(tree, mode, message):
+    """Validate an XML tree against the database schema according to the validation mode.
+
+    Parameters
+    ----------
+    tree : lxml.etree._ElementTree or lxml.etree._Element
+        Document to validate. It must not be modified while a deferred validation is pending.
+    mode : str
+        One of ``VALIDATION_MODES``. ``"strict"`` raises a ValueError for an invalid
+        document, ``"warn"`` logs the errors, ``"off"`` skips validation and
+        ``"deferred"`` validates on a background thread.
+    message : str
+        Description of the failure used in errors and log messages.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        For ``"deferred"`` mode, a future that resolves to None if the document is
+        valid and raises ValueError otherwise. None for all other modes.
+    """
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode {mode!r}. Expected one of {VALIDATION_MODES}")
+    if mode == "off":
+        return None
+
+    def validate():
+        relaxng = _get_relaxng()
+        with _validation_lock:
+            if relaxng.validate(tree):
+                return None
+            error_log = relaxng.error_log
+        if mode == "warn" or mode == "deferred":
+            logger.warning("%s:\n %s", message, str(error_log))
+        if mode == "strict" or mode == "deferred":
+            raise ValueError(message, error_log)
+
+    if mode == "deferred":
+        return _get_validation_executor().submit(validate)
+    validate()
+    return None
+
+
+# Maximum number of entries in each of the expression conversion caches
+EXPRESSION_CACHE_SIZE = 16384
+
+
+def _normalize_math_string(math_string):
+    # Whitespace is not significant in expressions, so drop it to improve cache hits
+    return ''.join(math_string.split())
+
+
+_identifier = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+_polynomial_token = re.compile(r'''
+    (?P<sign>[+-])
+  | (?P<times>\*(?!\*))
+  | (?P<number>{number})
+  | (?P<log>(?i:ln|log)\(T\))
+  | T\*\*(?:(?P<exponent>{number})|\((?P<signed_exponent>[+-]?{number})\))
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+'''.format(number=_NUMBER), re.VERBOSE)
+# Names the general parser gives special meaning to, e.g. constants and state variables other than T
+_polynomial_reserved_names = frozenset(['E', 'e', 'pi', 'I', 'inf', 'oo', 'zoo', 'nan', 'EulerGamma', 'Catalan',
+                                        'GoldenRatio', 'True', 'False']) | \
+    frozenset(str(x) for x in get_supported_variables().keys()) - {'T'}
+
+
+def _parse_number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def _parse_polynomial(math_string):
+    """Build the expression for a sum of products of numbers, symbols, T, ln(T) and powers of T.
+
+    This is the form of almost all Gibbs energy expressions, e.g.
+    ``-1000.5+12.25*T-2.5*T*ln(T)+0.0015*T**2+77500*T**(-1)+GHSERAL``. The result
+    is structurally identical to the one from ``_sympify_string``, including the
+    conversion of all numbers to floating point.
+
+    Parameters
+    ----------
+    math_string : str
+        Expression without whitespace.
+
+    Returns
+    -------
+    symengine.Expr or None
+        None if the string is not of the recognized form.
+    """
+    terms = []
+    products = set()
+    pos = 0
+    end = len(math_string)
+    if end == 0:
+        return None
+    while pos < end:
+        # Each term is an optional sign followed by factors separated by '*'
+        match = _polynomial_token.match(math_string, pos)
+        coefficient = 1
+        if match is not None and match.lastgroup == 'sign':
+            if match.group() == '-':
+                coefficient = -1
+            pos = match.end()
+            match = _polynomial_token.match(math_string, pos)
+        has_power = False
+        has_log = False
+        factors = []
+        while True:
+            if match is None:
+                return None
+            kind = match.lastgroup
+            if kind == 'number':
+                coefficient *= _parse_number(match.group())
+            elif kind == 'log':
+                if has_log:
+                    return None
+                factors.append(log(v.T))
+                has_log = True
+            elif kind in ('exponent', 'signed_exponent') or match.group() == 'T':
+                if has_power:
+                    return None
+                if kind == 'name':
+                    factors.append(v.T)
+                else:
+                    exponent = _parse_number(match.group(kind))
+                    if exponent == 0 or exponent == 1:
+                        return None
+                    factors.append(Pow(v.T, RealDouble(float(exponent))))
+                has_power = True
+            elif kind == 'name':
+                name = match.group()
+                if name in _polynomial_reserved_names or name.lower() in ('ln', 'log', 'exp'):
+                    return None
+                symbol = Symbol(name)
+                if symbol in factors:
+                    return None
+                factors.append(symbol)
+            else:
+                return None
+            pos = match.end()
+            match = _polynomial_token.match(math_string, pos)
+            if match is None or match.lastgroup != 'times':
+                break
+            pos = match.end()
+            match = _polynomial_token.match(math_string, pos)
+        if coefficient == 0:
+            return None
+        if pos < end and (match is None or match.lastgroup != 'sign'):
+            return None
+        # Like the general parser, integer coefficients of one vanish and all others become floats
+        if len(factors) == 0:
+            terms.append(RealDouble(float(coefficient)))
+            continue
+        product = _multiply(factors)
+        if product in products:
+            # Like terms would be collected with exact (integer) coefficients
+            return None
+        products.add(product)
+        if isinstance(coefficient, int) and coefficient == 1:
+            terms.append(product)
+        else:
+            terms.append(RealDouble(float(coefficient)) * product)
+    return Add(*terms)
+
+
+def _multiply(factors):
+    result = factors[0]
+    for factor in factors[1:]:
+        result = result * factor
     return result
 
 
-def convert_intervals_to_piecewise(interval_nodes):
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _convert_math_string(math_string):
+    expr = _parse_polynomial(math_string)
+    if expr is None:
+        # +0 is a hack, for how the function works
+        expr = _sympify_string(math_string+'+0')
+    return (0.0 + expr).xreplace({Symbol('T'): v.T, Symbol('P'): v.P})
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _convert_intervals(intervals):
     exprs = []
     conds = []
-    for interval_node in interval_nodes:
-        if interval_node.attrib['in'] != 'T':
+    for variable, lower, upper, math_string in intervals:
+        if variable != 'T':
             raise ValueError('Unsupported interval')
-        variable = interval_node.attrib['in']
-        lower = float(interval_node.attrib.get('lower', '-inf'))
-        upper = float(interval_node.attrib.get('upper', 'inf'))
-        math_expr = convert_math_to_symbolic([''.join(interval_node.itertext()).replace('\n', '').replace(' ', '').strip()])
+        math_expr = _convert_math_string(math_string)
         if upper != float('inf'):
             cond = And(lower <= getattr(v, variable, Symbol(variable)), upper > getattr(v, variable))
         else:
@@ -45,6 +254,148 @@ def convert_intervals_to_piecewise(interval_nodes):
     return Piecewise(*(list(zip(exprs, conds)) + [(0, True)]))
 
 
+def expression_cache_info():
+    """Return the hit and miss statistics of the expression conversion caches.
+
+    Returns
+    -------
+    dict
+        ``functools.lru_cache`` statistics for the ``"expressions"`` (text) and
+        ``"intervals"`` (piecewise) caches.
+    """
+    return {"expressions": _convert_math_string.cache_info(), "intervals": _convert_intervals.cache_info()}
+
+
+def clear_expression_cache():
+    """Clear the expression conversion caches and reset their statistics."""
+    _convert_math_string.cache_clear()
+    _convert_intervals.cache_clear()
+
+
+def _math_key(math_nodes):
+    # Hashable, picklable and tree-independent form of a list of text and Interval nodes
+    math_strings = tuple(_normalize_math_string(x) for x in math_nodes if isinstance(x, str))
+    interval_nodes = [x for x in math_nodes if (not isinstance(x, str)) and x.tag == 'Interval']
+    return math_strings, _intervals_key(interval_nodes)
+
+
+def _intervals_key(interval_nodes):
+    return tuple((interval_node.attrib['in'],
+                  float(interval_node.attrib.get('lower', '-inf')),
+                  float(interval_node.attrib.get('upper', 'inf')),
+                  _normalize_math_string(''.join(interval_node.itertext())))
+                 for interval_node in interval_nodes)
+
+
+def _convert_math_key(math_key):
+    math_strings, intervals = math_key
+    result = 0.0
+    for math_string in math_strings:
+        result += _convert_math_string(math_string)
+    result += _convert_intervals(intervals)
+    return result
+
+
+def convert_math_to_symbolic(math_nodes, lazy=False):
+    math_key = _math_key(math_nodes)
+    if lazy:
+        return LazyExpr(math_key)
+    return _convert_math_key(math_key)
+
+
+def convert_intervals_to_piecewise(interval_nodes):
+    # Conversion is memoized on the interval variables, bounds and normalized text
+    return _convert_intervals(_intervals_key(interval_nodes))
+
+
+class LazyExpr(object):
+    """Symbolic expression that is converted from its XML text on first use.
+
+    The converted expression is memoized. Instances compare and hash equal to
+    their expression and can be used directly in SymEngine arithmetic.
+
+    Parameters
+    ----------
+    math_key : tuple
+        Normalized expression strings and interval bounds and strings.
+    """
+    __slots__ = ('math_key', '_value')
+
+    def __init__(self, math_key):
+        self.math_key = math_key
+        self._value = None
+
+    @property
+    def value(self):
+        "SymEngine expression, converted on first access."
+        if self._value is None:
+            self._value = _convert_math_key(self.math_key)
+        return self._value
+
+    def referenced_names(self):
+        "Names of all identifiers in the expression text, a superset of the names of its free symbols."
+        math_strings, intervals = self.math_key
+        return set(_identifier.findall(' '.join(math_strings + tuple(interval[3] for interval in intervals))))
+
+    def _symengine_(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == resolve(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __reduce__(self):
+        return (LazyExpr, (self.math_key,))
+
+    def __repr__(self):
+        return 'LazyExpr({0!r})'.format(self.math_key)
+
+
+def resolve(value):
+    "Return the SymEngine expression for `value`, converting it if it is a LazyExpr."
+    if isinstance(value, LazyExpr):
+        return value.value
+    return value
+
+
+class LazySymbols(dict):
+    """Dictionary of Database symbols whose LazyExpr values are converted on access."""
+    def __getitem__(self, key):
+        return resolve(dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        return resolve(dict.get(self, key, default))
+
+    def pop(self, key, *args):
+        return resolve(dict.pop(self, key, *args))
+
+    def items(self):
+        return [(key, resolve(value)) for key, value in dict.items(self)]
+
+    def values(self):
+        return [resolve(value) for value in dict.values(self)]
+
+    def copy(self):
+        return LazySymbols(dict.items(self))
+
+    def __reduce__(self):
+        return (LazySymbols, (list(dict.items(self)),))
+
+
+class LazyParameterDocument(Document):
+    """TinyDB document that converts a LazyExpr parameter value when the document is retrieved."""
+    def __init__(self, value, doc_id):
+        super().__init__(value, doc_id)
+        parameter = self.get('parameter')
+        if isinstance(parameter, LazyExpr):
+            self['parameter'] = parameter.value
+
+
 def convert_symbolic_to_nodes(sym):
     nodes = []
     if isinstance(sym, Piecewise):
@@ -74,14 +425,182 @@ def convert_symbolic_to_nodes(sym):
     return nodes
 
 
-def parse_cef_parameter(param_node):
-    order_nodes = param_node.xpath('./Order')
+def _value_args(expr):
+    # Arguments of an expression that are values, i.e. excluding the conditions of a Piecewise
+    if isinstance(expr, Piecewise):
+        return expr.args[0::2]
+    return expr.args
+
+
+def replace_subexpressions(expr, replacements):
+    """Replace subexpressions like ``expr.xreplace(replacements)``, except in the conditions of Piecewise expressions.
+
+    Conditions are written as temperature intervals, which must keep referring to
+    the state variables themselves.
+
+    Parameters
+    ----------
+    expr : symengine.Basic
+        Expression to rewrite.
+    replacements : dict
+        Map of subexpressions to the expressions that replace them.
+
+    Returns
+    -------
+    symengine.Basic
+    """
+    memo = {}
+
+    def replace(expr):
+        replacement = replacements.get(expr)
+        if replacement is not None:
+            return replacement
+        rewritten = memo.get(expr)
+        if rewritten is None:
+            args = expr.args
+            if isinstance(expr, Piecewise):
+                new_args = [replace(arg) if i % 2 == 0 else arg for i, arg in enumerate(args)]
+            else:
+                new_args = [replace(arg) for arg in args]
+            if all(new_arg is arg for new_arg, arg in zip(new_args, args)):
+                rewritten = expr
+            elif isinstance(expr, Piecewise):
+                rewritten = Piecewise(*zip(new_args[0::2], new_args[1::2]))
+            else:
+                rewritten = expr.func(*new_args)
+            memo[expr] = rewritten
+        return rewritten
+
+    return replace(expr) if len(replacements) > 0 else expr
+
+
+def hoist_common_subexpressions(symbols, values, min_size=10, prefix="CSE"):
+    """Find subexpressions that are repeated across symbols and values and name each one once.
+
+    A subexpression of at least `min_size` nodes is hoisted if it occurs more
+    than once outside of the subexpressions that are hoisted themselves.
+    Occurrences of the value of an existing symbol are replaced by that symbol.
+
+    Parameters
+    ----------
+    symbols : dict
+        Map of symbol names to expressions, e.g. ``dbf.symbols``.
+    values : iterable
+        Other expressions that may share subexpressions, e.g. parameter values.
+    min_size : int, optional
+        Minimum number of nodes in the expression tree of a hoisted subexpression.
+    prefix : str, optional
+        Prefix of the names of the new symbols, which are numbered in order of first occurrence.
+
+    Returns
+    -------
+    (dict, dict)
+        Symbols rewritten to refer to the hoisted subexpressions, including a new
+        symbol for each one, and the map of subexpressions to the Symbol that
+        replaces them, for use with ``replace_subexpressions``.
+    """
+    sizes = {}  # number of nodes of each distinct subexpression, in order of first occurrence
+    counts = Counter()  # occurrences, not counting repeats inside subexpressions already seen
+    taken_names = set(symbols)
+
+    def visit(expr):
+        # Size of `expr`, visiting its arguments on its first occurrence only
+        size = sizes.get(expr)
+        if size is None:
+            if isinstance(expr, Symbol):
+                taken_names.add(str(expr))
+            size = sizes[expr] = 1 + sum(visit_occurrence(arg) for arg in _value_args(expr))
+        return size
+
+    def visit_occurrence(expr):
+        counts[expr] += 1
+        return visit(expr)
+
+    names = {}
+    for name, expr in sorted(symbols.items()):
+        if isinstance(expr, Basic):
+            names.setdefault(expr, name)
+            visit(expr)
+    for value in values:
+        if isinstance(value, Basic):
+            visit_occurrence(value)
+
+    replacements = {expr: Symbol(name) for expr, name in names.items() if sizes[expr] >= min_size and counts[expr] > 0}
+    new_names = (f"{prefix}{i}" for i in range(1, len(sizes) + len(taken_names) + 1))
+    new_symbols = {}
+    for expr, size in sizes.items():
+        if expr not in names and size >= min_size and counts[expr] > 1:
+            name = next(name for name in new_names if name not in taken_names)
+            replacements[expr] = Symbol(name)
+            new_symbols[name] = expr
+
+    def rewrite_definition(expr):
+        # A definition refers to the other hoisted subexpressions, but not to itself
+        own_symbol = replacements.pop(expr, None)
+        try:
+            return replace_subexpressions(expr, replacements)
+        finally:
+            if own_symbol is not None:
+                replacements[expr] = own_symbol
+
+    rewritten = {}
+    for name, expr in list(symbols.items()) + list(new_symbols.items()):
+        if not isinstance(expr, Basic):
+            rewritten[name] = expr
+        elif expr in replacements and names.get(expr, name) != name:
+            # Same value as another symbol
+            rewritten[name] = replacements[expr]
+        else:
+            rewritten[name] = rewrite_definition(expr)
+    return rewritten, replacements
+
+
+def _group_children(node):
+    """Group the child elements of a node by tag in a single pass.
+
+    Returns the groups and the text content of the node itself, i.e. the
+    equivalent of ``''.join(node.xpath('./text()')).strip()``.
+    """
+    children = {}
+    text = [node.text or '']
+    for child in node:
+        children.setdefault(child.tag, []).append(child)
+        if child.tail:
+            text.append(child.tail)
+    return children, ''.join(text).strip()
+
+
+def _child_refids(nodes, tag):
+    # refid attributes of the children with the given tag, like xpath('./{tag}/@refid') for each node
+    return [[c.get('refid') for c in node if c.tag == tag and c.get('refid') is not None] for node in nodes]
+
+
+def _sites(constituent_array_nodes):
+    return [site for node in constituent_array_nodes for site in node if site.tag == 'Site']
+
+
+# Constituents referenced by a Parameter, used to filter parameters by element
+_parameter_constituent_refids = etree.XPath('./ConstituentArray/Site/Constituent/@refid', smart_strings=False)
+
+
+def _parameter_order(children):
+    order_nodes = children.get('Order', [])
     if len(order_nodes) == 0:
-        int_order = 0
-    else:
-        int_order = int(order_nodes[0].text)
-    constituent_array = [t.xpath('./Constituent/@refid') for t in param_node.xpath('./ConstituentArray/Site')]
-    return int_order, constituent_array
+        return 0
+    return int(order_nodes[0].text)
+
+
+def _constituent_refids(children):
+    # Constituent names of each sublattice of a parameter, as a tuple of tuples
+    return tuple(tuple(c.get('refid') for c in site if c.tag == 'Constituent' and c.get('refid') is not None)
+                 for node in children.get('ConstituentArray', []) for site in node if site.tag == 'Site')
+
+
+def parse_cef_parameter(param_node, children=None):
+    if children is None:
+        children, _ = _group_children(param_node)
+    constituent_array = [list(names) for names in _constituent_refids(children)]
+    return _parameter_order(children), constituent_array
 
 # Symmetry options handled separately in XML
 phase_options = {'ionic_liquid_2SL': 'TwoSublatticeIonicLiquid',
@@ -104,33 +623,119 @@ def _get_single_node(nodes, allow_zero=False):
         raise ValueError(f"Unexpected number of nodes for {nodes}. Got {len(nodes)}, expected {'zero or ' if allow_zero else ''} one")
 
 
+# Everything needed to add a phase and its parameters to a Database, independent of the XML tree.
+# Each parameter is a complete record as built by `Database.add_parameter`, ready to be inserted.
+PhaseData = namedtuple('PhaseData', ['phase_name', 'model_hints', 'site_ratios', 'sublattice_model', 'parameters'])
+
+
+class ParseContext(object):
+    """State shared by the parsers for the duration of a single read.
+
+    Parameters
+    ----------
+    species : iterable of Species, optional
+        Species defined so far. More are added with ``add_species`` as they are parsed.
+    phases : set, optional
+        Names of the phases to convert. Defaults to all phases.
+    elements : set, optional
+        Names of the selected elements. Parameters with constituents made of any
+        other element are skipped before their values are converted. Defaults to all elements.
+    lazy : bool, optional
+        If True, values are LazyExpr objects instead of converted expressions.
+    stats : Stats, optional
+        Collector of timings and counts. Defaults to collecting nothing.
+    """
+    def __init__(self, species=(), phases=None, elements=None, lazy=False, stats=None):
+        self.phases = phases
+        self.elements = elements
+        self.lazy = lazy
+        self.stats = stats if stats is not None else NULL_STATS
+        self.species_dict = {}
+        self.excluded_species = set()
+        # Interned Species of constituent names and constituent arrays of parameters, keyed by
+        # their refids, so that parameters with the same constituents share the same objects
+        self._constituents = {}
+        self._constituent_arrays = {}
+        self.add_species(species)
+
+    def add_species(self, species):
+        for sp in species:
+            self.species_dict[sp.name] = sp
+            if self.elements is not None and not self.elements.issuperset(sp.constituents):
+                self.excluded_species.add(sp.name)
+        # Names that were undefined so far may refer to the new species
+        self._constituents.clear()
+        self._constituent_arrays.clear()
+
+    def constituent(self, name):
+        "Species of a constituent name, or a new Species of that name if it is undefined, shared for the whole read."
+        species = self._constituents.get(name)
+        if species is None:
+            species = self.species_dict.get(name.upper())
+            if species is None:
+                species = v.Species(name)
+            self._constituents[name] = species
+        return species
+
+    def constituent_array(self, refids, ordered=False):
+        """Constituent array of a parameter as a tuple of tuples of Species, shared by all parameters with the same constituents.
+
+        Parameters
+        ----------
+        refids : iterable of tuple of str
+            Constituent names of each sublattice.
+        ordered : bool, optional
+            If False, the constituents of each sublattice are sorted by name, so
+            that the same constituents in any order share one array. If True, their
+            order is preserved, as for MQMQA and QKTO parameters.
+        """
+        if ordered:
+            key = (True, tuple(refids))
+        else:
+            key = (False, tuple(names if len(names) < 2 else tuple(sorted(names)) for names in refids))
+        constituent_array = self._constituent_arrays.get(key)
+        if constituent_array is None:
+            constituent_array = tuple(tuple(self.constituent(name) for name in names) for names in key[1])
+            self._constituent_arrays[key] = constituent_array
+        return constituent_array
+
+
 def parse_model(dbf, phase_name, model_node, parameters):
-    species_dict = {s.name: s for s in dbf.species}
+    add_phase_data(dbf, parse_model_data(ParseContext(dbf.species), phase_name, model_node, parameters))
+
+
+def parse_model_data(context, phase_name, model_node, parameters):
+    species_dict = context.species_dict
+    stats = context.stats
+    stats.count("phases")
+    stats.count("parameters", len(parameters))
     model_type = model_node.attrib["type"]
-    site_ratios = [float(m) for m in model_node.xpath('./ConstituentArray/Site/@ratio')]
+    model_children, _ = _group_children(model_node)
+    sites = _sites(model_children.get('ConstituentArray', []))
+    site_ratios = [float(s.get('ratio')) for s in sites if s.get('ratio') is not None]
     if len(site_ratios) == 0:  # i.e. they are not found
         site_ratios = [1.0]  # MQMQA special case: 1 sublattice with 1 mole of "quadruplet" species
-    sublattice_model = [s.xpath('./Constituent/@refid') for s in model_node.xpath('./ConstituentArray/Site')]
+    sublattice_model = _child_refids(sites, 'Constituent')
 
     model_hints = {}
-    magnetic_ordering_nodes = model_node.xpath('./MagneticOrdering')
+    magnetic_ordering_nodes = model_children.get('MagneticOrdering', [])
     for magnetic_ordering_node in magnetic_ordering_nodes:
         if magnetic_ordering_node.attrib['type'] == 'IHJ':
             model_hints['ihj_magnetic_afm_factor'] = float(magnetic_ordering_node.attrib['afm_factor'])
             model_hints['ihj_magnetic_structure_factor'] = float(magnetic_ordering_node.attrib['structure_factor'])
         else:
             raise ValueError('Unknown magnetic ordering model')
-    atomic_ordering_nodes = model_node.xpath('./AtomicOrdering')
+    atomic_ordering_nodes = model_children.get('AtomicOrdering', [])
     for atomic_ordering_node in atomic_ordering_nodes:
         model_hints['ordered_phase'] = str(atomic_ordering_node.attrib['ordered_part'])
         model_hints['disordered_phase'] = str(atomic_ordering_node.attrib['disordered_part'])
     # Simple phase options
     for ipo in inv_phase_options.keys():
-        ipo_nodes = model_node.xpath('./'+str(ipo))
+        ipo_nodes = model_children.get(ipo, [])
         for ipo_node in ipo_nodes:
             model_hints[inv_phase_options[ipo_node.tag]] = True
     # Parameter symmetry options
-    symmetry_nodes = model_node.xpath('./Symmetry')
+    symmetry_nodes = model_children.get('Symmetry', [])
     for symmetry_node in symmetry_nodes:
         model_hints['symmetry_'+str(symmetry_node.attrib['type'])] = True
 
@@ -142,7 +747,7 @@ def parse_model(dbf, phase_name, model_node, parameters):
             "cations": {},
             "anions": {},
         }
-        for chemical_group_node in model_node.xpath('./ChemicalGroups'):
+        for chemical_group_node in model_children.get('ChemicalGroups', []):
             # MQMQA cations and anions
             cation_node = _get_single_node(chemical_group_node.xpath('./Cations'))
             for constituent_node in cation_node.xpath('./Constituent'):
@@ -155,69 +760,101 @@ def parse_model(dbf, phase_name, model_node, parameters):
         model_hints["mqmqa"]["chemical_groups"] = chemical_groups_hint
     else:
         # Non-MQMQA chemical groups
-        chemical_groups_node = _get_single_node(model_node.xpath('./ChemicalGroups'), allow_zero=True)
+        chemical_groups_node = _get_single_node(model_children.get('ChemicalGroups', []), allow_zero=True)
         if chemical_groups_node is not None:
             model_hints["chemical_groups"] = {}
             for constituent_node in chemical_groups_node.xpath('./Constituent'):
                 sp = species_dict[constituent_node.attrib["refid"]]
                 model_hints["chemical_groups"][sp] = int(constituent_node.attrib["groupid"])
 
-    dbf.add_structure_entry(phase_name, phase_name)
-    dbf.add_phase(phase_name, model_hints, site_ratios)
-    dbf.add_phase_constituents(phase_name, sublattice_model)
-
+    param_records = []
     for param_node in parameters:
         param_data = {}  # optional and keyword data for add_parameter
         param_type = param_node.attrib['type']
+        children, text = _group_children(param_node)
 
-        int_order, constituent_array = parse_cef_parameter(param_node)
         if (model_type in "MQMQA") or (param_type == "QKT"):
             # Special MQMQA/QKTO handling, which do not have Redlich-Kister parameters.
             # Redlich-Kister "order" has no meaning
             int_order = None
             # Parameters should not be sorted as the constituent order is related to particular exponents
-            constituent_array = [[str(c) for c in lx] for lx in constituent_array]
+            constituent_array = context.constituent_array(_constituent_refids(children), ordered=True)
         else:
-            constituent_array = [[str(c) for c in sorted(lx)] for lx in constituent_array]
+            int_order = _parameter_order(children)
+            constituent_array = context.constituent_array(_constituent_refids(children))
 
         # Parameter value
         # Interval _and_ text (if any) to be able to handle intervals or scalar expressions
-        param_nodes = param_node.xpath('./Interval') + [''.join(param_node.xpath('./text()')).strip()]
-        function_obj = convert_math_to_symbolic(param_nodes)
+        param_nodes = children.get('Interval', []) + [text]
+        stats.count("intervals", len(param_nodes) - 1)
+        with stats.stage("convert"):
+            function_obj = convert_math_to_symbolic(param_nodes, lazy=context.lazy)
 
         # TODO: Reference
 
         # Diffusing species
-        diffusing_species_refid = _get_single_node(param_node.xpath('./DiffusingSpecies/@refid'), allow_zero=True)
+        diffusing_species_refid = _get_single_node(_child_refids([param_node], 'DiffusingSpecies')[0], allow_zero=True)
         if diffusing_species_refid is not None:
             param_data["diffusing_species"] = str(diffusing_species_refid)
 
         # Special metadata for particular parameter types
         if param_type == "MQMG":
-            param_data["zeta"] = float(_get_single_node(param_node.xpath('./Zeta')).text)
+            param_data["zeta"] = float(_get_single_node(children.get('Zeta', [])).text)
             # Assumption that in the model implementation, only the first stoichiometry matters  - this is the only one in the XML representation.
-            stoichiometric_factors_node = _get_single_node(param_node.xpath('./StoichiometricFactors'))
+            stoichiometric_factors_node = _get_single_node(children.get('StoichiometricFactors', []))
             param_data["stoichiometry"] = list(map(float, stoichiometric_factors_node.text.split()))
         elif param_type == "MQMZ":
-            coordinations_node = _get_single_node(param_node.xpath('./Coordinations'))
+            coordinations_node = _get_single_node(children.get('Coordinations', []))
             param_data["coordinations"] = list(map(float, coordinations_node.text.split()))
             function_obj = None  # special MQMQA handling - no symbolic parameter value, so ensure it cannot exist
         elif param_type == "MQMX":
-            param_data["mixing_code"] = _get_single_node(param_node.xpath('./MixingCode')).attrib["type"]
-            exponents_node = _get_single_node(param_node.xpath('./Exponents'))
+            param_data["mixing_code"] = _get_single_node(children.get('MixingCode', [])).attrib["type"]
+            exponents_node = _get_single_node(children.get('Exponents', []))
             param_data["exponents"] = list(map(float, exponents_node.text.split()))
-            additional_mixing_constituent_refid = _get_single_node(param_node.xpath('./AdditionalMixingConstituent/@refid'), allow_zero=True)
+            additional_mixing_constituent_refid = _get_single_node(_child_refids([param_node], 'AdditionalMixingConstituent')[0], allow_zero=True)
             if additional_mixing_constituent_refid is not None:
                 param_data["additional_mixing_constituent"] = species_dict[str(additional_mixing_constituent_refid)]
-                param_data["additional_mixing_exponent"] = float(_get_single_node(param_node.xpath('./AdditionalMixingExponent')).text)
+                param_data["additional_mixing_exponent"] = float(_get_single_node(children.get('AdditionalMixingExponent', [])).text)
             else:
-                param_data["additional_mixing_constituent"] = v.Species(None)
+                param_data["additional_mixing_constituent"] = _NO_SPECIES
                 param_data["additional_mixing_exponent"] = 0  # Arbitrary
         elif param_type == "QKT":
-            exponents_node = _get_single_node(param_node.xpath('./Exponents'))
+            exponents_node = _get_single_node(children.get('Exponents', []))
             param_data["exponents"] = list(map(float, exponents_node.text.split()))
 
-        dbf.add_parameter(param_type, phase_name, constituent_array, int_order, function_obj, force_insert=False, **param_data)
+        param_records.append(_parameter_record(phase_name, param_type, constituent_array,
+                                               int_order, function_obj, param_data))
+    return PhaseData(phase_name, model_hints, site_ratios, sublattice_model, param_records)
+
+
+# Species of parameters without a diffusing species or additional mixing constituent
+_NO_SPECIES = v.Species(None)
+
+
+def _parameter_record(phase_name, param_type, constituent_array, param_order, param, param_data):
+    # Equivalent to the record Database.add_parameter queues, without rebuilding its
+    # species dictionary and constructing a Species for every constituent.
+    diffusing_species = param_data.pop('diffusing_species', None)
+    record = {
+        'phase_name': phase_name,
+        'constituent_array': constituent_array,
+        'parameter_type': param_type,
+        'parameter_order': param_order,
+        'parameter': param,
+        'diffusing_species': _NO_SPECIES if diffusing_species is None else v.Species(diffusing_species),
+        'reference': None,
+    }
+    record.update(param_data)
+    return record
+
+
+def add_phase_data(dbf, phase_data):
+    phase_name = phase_data.phase_name
+    dbf.add_structure_entry(phase_name, phase_name)
+    dbf.add_phase(phase_name, phase_data.model_hints, phase_data.site_ratios)
+    dbf.add_phase_constituents(phase_name, phase_data.sublattice_model)
+    # Queued for a single insert by Database.process_parameter_queue
+    dbf._parameter_queue.extend(phase_data.parameters)
 
 
 def _setitem_raise_duplicates(dictionary, key, value):
@@ -226,211 +863,944 @@ def _setitem_raise_duplicates(dictionary, key, value):
     dictionary[key] = value
 
 
-def read_xml(dbf, fd):
-    parser = etree.XMLParser(load_dtd=False,
-                             no_network=True)
-    tree = etree.parse(fd, parser=parser)
-    relaxng = etree.RelaxNG(etree.parse(this_dir / 'database.rng'))
-    if not relaxng.validate(tree):
-        logger.warn(relaxng.error_log)
-    root = tree.getroot()
-
-    for child in root:
-        if child.tag == 'ChemicalElement':
-            element = str(child.attrib['id'])
-            dbf.species.add(v.Species(element, {element: 1}, charge=0))
-            dbf.elements.add(element)
-            _process_reference_state(dbf, element, child.attrib['reference_phase'],
-                                     float(child.attrib['mass']), float(child.attrib['H298']), float(child.attrib['S298']))
-        elif child.tag == 'Species':
-            species = str(child.attrib['id'])
-            constituent_dict = {}
-            species_charge = float(child.attrib.get('charge', 0))
-            constituent_nodes = child.xpath('./ChemicalElement')
-            for constituent_node in constituent_nodes:
-                el = constituent_node.attrib['refid']
-                ratio = float(constituent_node.attrib['ratio'])
-                constituent_dict[el] = ratio
-            dbf.species.add(v.Species(species, constituent_dict, charge=species_charge))
-        elif child.tag == 'Expr':
-            function_name = str(child.attrib['id'])
-            # Interval _and_ text (if any) to be able to handle intervals or scalar expressions
-            expr_nodes = child.xpath('./Interval') + [''.join(child.xpath('./text()')).strip()]
-            function_obj = convert_math_to_symbolic(expr_nodes)
-            _setitem_raise_duplicates(dbf.symbols, function_name, function_obj)
-        elif child.tag == 'Phase':
-            model_nodes = child.xpath('./Model')
-            if len(model_nodes) == 0:
+def parse_chemical_element(dbf, node):
+    element = str(node.attrib['id'])
+    species = v.Species(element, {element: 1}, charge=0)
+    dbf.species.add(species)
+    dbf.elements.add(element)
+    _process_reference_state(dbf, element, node.attrib['reference_phase'],
+                             float(node.attrib['mass']), float(node.attrib['H298']), float(node.attrib['S298']))
+    return species
+
+
+def parse_species(dbf, node):
+    species = str(node.attrib['id'])
+    constituent_dict = {}
+    species_charge = float(node.attrib.get('charge', 0))
+    constituent_nodes = node.xpath('./ChemicalElement')
+    for constituent_node in constituent_nodes:
+        el = constituent_node.attrib['refid']
+        ratio = float(constituent_node.attrib['ratio'])
+        constituent_dict[el] = ratio
+    species = v.Species(species, constituent_dict, charge=species_charge)
+    dbf.species.add(species)
+    return species
+
+
+def parse_expr(dbf, node, lazy=False, stats=NULL_STATS):
+    function_name = str(node.attrib['id'])
+    # Interval _and_ text (if any) to be able to handle intervals or scalar expressions
+    children, text = _group_children(node)
+    expr_nodes = children.get('Interval', []) + [text]
+    stats.count("exprs")
+    stats.count("intervals", len(expr_nodes) - 1)
+    with stats.stage("convert"):
+        function_obj = convert_math_to_symbolic(expr_nodes, lazy=lazy)
+    _setitem_raise_duplicates(dbf.symbols, function_name, function_obj)
+
+
+def parse_phase_data(context, node):
+    """Convert a Phase node to PhaseData, or None if the phase has no supported model or is not selected.
+
+    Parameters
+    ----------
+    context : ParseContext
+        Species defined in the database and the selection of the current read.
+    node : lxml.etree._Element
+        Phase node.
+    """
+    phase_name = str(node.attrib['id'])
+    if context.phases is not None and phase_name not in context.phases:
+        return None
+    with context.stats.phase(phase_name):
+        return _parse_phase_node(context, phase_name, node)
+
+
+def _parse_phase_node(context, phase_name, node):
+    children, _ = _group_children(node)
+    model_nodes = children.get('Model', [])
+    if len(model_nodes) == 0:
+        return None
+    model_node = model_nodes[0]
+    parameters = children.get('Parameter', [])
+    if context.elements is not None:
+        excluded_species = context.excluded_species
+        parameters = [param_node for param_node in parameters
+                      if excluded_species.isdisjoint(_parameter_constituent_refids(param_node))]
+    if model_node.attrib['type'] in ("MQMQA", "CEF"):
+        return parse_model_data(context, phase_name, model_node, parameters)
+    return None
+
+
+def parse_phase(dbf, node, context=None):
+    if context is None:
+        context = ParseContext(dbf.species)
+    phase_data = parse_phase_data(context, node)
+    if phase_data is not None:
+        add_phase_data(dbf, phase_data)
+
+
+_read_worker_state = None
+
+
+def _init_read_worker(species, phases, elements, n_slowest):
+    # Process pool initializer. Worker processes receive the species and the selection once,
+    # instead of with every phase, and keep one context so that their phases share constituent arrays.
+    global _read_worker_state
+    _read_worker_state = (ParseContext(species, phases=phases, elements=elements, lazy=True), n_slowest)
+
+
+def _parse_phase_fragment(fragment):
+    # Process pool entry point: parse a serialized Phase node. Values are left unconverted, as
+    # LazyExpr of their math keys, and constituent arrays are returned as names, since both
+    # pickle much faster than SymEngine expressions and Species. The caller converts them through
+    # its expression cache and constituent tables. Statistics are collected for each phase and
+    # merged by the caller.
+    context, n_slowest = _read_worker_state
+    context.stats = Stats(n_slowest) if n_slowest is not None else NULL_STATS
+    node = etree.fromstring(fragment, parser=etree.XMLParser(load_dtd=False, no_network=True))
+    phase_data = parse_phase_data(context, node)
+    if phase_data is not None:
+        for record in phase_data.parameters:
+            record['constituent_array'] = tuple(tuple(sp.name for sp in species) for species in record['constituent_array'])
+    return phase_data, context.stats if n_slowest is not None else None
+
+
+def _adopt_phase_data(context, phase_data):
+    # Complete PhaseData parsed in a worker process: build its constituent arrays from their names,
+    # shared with the rest of the read, and convert its values unless the read is lazy
+    for record in phase_data.parameters:
+        record['constituent_array'] = context.constituent_array(record['constituent_array'], ordered=True)
+        if not context.lazy:
+            record['parameter'] = resolve(record['parameter'])
+    return phase_data
+
+
+def _read_phases_in_pool(dbf, context, fragments, workers, cancel_check=None):
+    # Parse serialized Phase nodes in a pool of worker processes and add them in document order
+    stats = context.stats
+    initargs = (tuple(context.species_dict.values()), context.phases, context.elements,
+                stats.n_slowest if stats.enabled else None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_read_worker, initargs=initargs) as executor:
+        results = executor.map(_parse_phase_fragment, fragments, chunksize=max(1, len(fragments) // (4 * workers)))
+        try:
+            for _ in fragments:
+                check_cancelled(cancel_check)
+                with stats.stage("phases"):
+                    phase_data, phase_stats = next(results)
+                if phase_stats is not None:
+                    stats.merge(phase_stats)
+                if phase_data is not None:
+                    with stats.stage("convert"):
+                        phase_data = _adopt_phase_data(context, phase_data)
+                    with stats.stage("add_parameter"):
+                        add_phase_data(dbf, phase_data)
+        except CancelledError:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def _referenced_names(value):
+    if isinstance(value, LazyExpr):
+        return value.referenced_names()
+    return [str(sym) for sym in getattr(value, 'free_symbols', [])]
+
+
+def expr_identifiers(node):
+    "Identifiers in the value of an Expr node, i.e. the names of the symbols it may refer to."
+    return _identifier.findall(''.join(node.itertext()))
+
+
+def referenced_expr_names(dbf, expr_references):
+    """Names that queued parameters reference, directly or through the Exprs in `expr_references`.
+
+    `expr_references` maps the name of each Expr to the identifiers in its value.
+    """
+    pending = [name for param in dbf._parameter_queue for name in _referenced_names(param['parameter'])]
+    referenced = set()
+    while len(pending) > 0:
+        name = pending.pop()
+        if name not in referenced:
+            referenced.add(name)
+            pending.extend(expr_references.get(name, []))
+    return referenced
+
+
+def check_cancelled(cancel_check):
+    """Raise ``concurrent.futures.CancelledError`` if `cancel_check` is given and returns True."""
+    if cancel_check is not None and cancel_check():
+        raise CancelledError()
+
+
+def parse_referenced_exprs(dbf, expr_nodes, lazy=False, stats=NULL_STATS, cancel_check=None):
+    """Convert only the Expr nodes that queued parameters reference, directly or through other Exprs."""
+    expr_references = {str(node.attrib['id']): expr_identifiers(node) for node in expr_nodes}
+    referenced = referenced_expr_names(dbf, expr_references)
+    for node in expr_nodes:
+        check_cancelled(cancel_check)
+        if str(node.attrib['id']) in referenced:
+            parse_expr(dbf, node, lazy=lazy, stats=stats)
+
+
+# Parsers for the top-level children of the Database node, in the order they are dispatched
+_root_child_parsers = {
+    'ChemicalElement': parse_chemical_element,
+    'Species': parse_species,
+    'Expr': parse_expr,
+    'Phase': parse_phase,
+}
+
+# Size of the chunks fed to the incremental parser when streaming
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_root_children(fd):
+    """Incrementally parse a database and yield each top-level element once it is complete.
+
+    Each element is cleared, and released along with its preceding siblings, as
+    soon as the consumer advances, so memory use is bounded by the largest single
+    top-level element rather than by the size of the document.
+
+    Parameters
+    ----------
+    fd : file-like
+        Text or binary file descriptor to read from.
+
+    Yields
+    ------
+    lxml.etree._Element
+    """
+    parser = etree.XMLPullParser(events=('end',), load_dtd=False, no_network=True)
+    while True:
+        chunk = fd.read(_STREAM_CHUNK_SIZE)
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+        for _, node in parser.read_events():
+            parent = node.getparent()
+            if parent is None or parent.getparent() is not None:
+                # Skip the root itself and anything nested below the top level
                 continue
-            model_node = model_nodes[0]
-            phase_name = child.attrib['id']
-            parameters = child.xpath('./Parameter')
-            if model_node.attrib['type'] in ("MQMQA", "CEF"):
-                parse_model(dbf, phase_name, model_node, parameters)
-    dbf.process_parameter_queue()
+            yield node
+            node.clear()
+            while node.getprevious() is not None:
+                del parent[0]
+        if not chunk:
+            break
+
+
+def disordered_parts(phase_nodes):
+    """Map of the names of ordered phases to the names of their disordered parts.
+
+    Parameters
+    ----------
+    phase_nodes : iterable of lxml.etree._Element
+        Phase nodes, whose models may have an AtomicOrdering.
+
+    Returns
+    -------
+    dict
+    """
+    return {node.get('ordered_part'): node.get('disordered_part')
+            for phase_node in phase_nodes for node in phase_node.iterfind('Model/AtomicOrdering')}
+
+
+def close_phase_selection(phases, disordered_parts):
+    """Selected phases, along with the disordered parts of the selected ordered phases.
+
+    A Model of an ordered phase is built from the parameters of its disordered
+    part, so selecting one without the other gives an unusable Database.
+
+    Parameters
+    ----------
+    phases : iterable of str
+        Names of the selected phases.
+    disordered_parts : dict
+        Map of ordered phase names to the names of their disordered parts, see ``disordered_parts``.
+
+    Returns
+    -------
+    frozenset
+    """
+    selected = set(phases)
+    pending = list(selected)
+    while len(pending) > 0:
+        part = disordered_parts.get(pending.pop())
+        if part is not None and part not in selected:
+            selected.add(part)
+            pending.append(part)
+    return frozenset(selected)
+
+
+def _prescan_disordered_parts(fd):
+    # Disordered parts of the ordered phases of a file that is then read from the start again.
+    # Files that cannot seek are read into memory first.
+    if not fd.seekable():
+        data = fd.read()
+        fd = io.BytesIO(data) if isinstance(data, bytes) else io.StringIO(data)
+    position = fd.tell()
+    parts = disordered_parts(node for node in iter_root_children(fd) if node.tag == 'Phase')
+    fd.seek(position)
+    return fd, parts
+
+
+def _timed_iter(iterable, stats, stage):
+    # Add the time spent producing each item of an iterator to a stage
+    iterator = iter(iterable)
+    while True:
+        with stats.stage(stage):
+            item = next(iterator, None)
+        if item is None:
+            return
+        yield item
+
+
+def read_xml(dbf, fd, validate=None, stream=False, workers=None, elements=None, phases=None, lazy=False, stats=None,
+             fingerprint=None, cancel_check=None):
+    """Read an XML database into a Database object.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to add the data to.
+    fd : file-like
+        File descriptor to read from. Content compressed with gzip, bz2 or xz is
+        detected from its magic bytes and decompressed while it is parsed.
+    validate : str, optional
+        Schema validation mode, one of ``"strict"``, ``"warn"``, ``"off"`` or ``"deferred"``.
+        Defaults to ``"warn"``, or ``"off"`` when streaming.
+    stream : bool, optional
+        If True, parse the document incrementally and discard each top-level element
+        after it is processed, instead of holding the whole document tree in memory.
+        Schema validation requires the whole tree, so only ``validate="off"`` is supported.
+    workers : int, optional
+        If greater than one, convert phases and their parameters in a pool of this
+        many processes. The workers return parameter values unconverted, and they
+        are converted through the expression cache of the calling process unless
+        `lazy` is True. Phases are added to the Database in document order, after
+        all other top-level elements.
+    elements : list of str, optional
+        Only load parameters whose constituents are made of these elements. As for
+        the components of a Model, include ``"VA"`` if vacancies are needed.
+    phases : list of str, optional
+        Only load these phases, and the disordered parts of the selected ordered
+        phases, which their models need. When streaming, this requires a first
+        pass over the file to find the disordered parts, and a file that cannot
+        seek is read into memory.
+    lazy : bool, optional
+        If True, defer the conversion of symbols and parameter values to SymEngine
+        expressions until each one is first accessed. ``dbf.symbols`` becomes a
+        LazySymbols dictionary and parameters are converted when they are retrieved
+        from ``dbf._parameters``.
+    stats : Stats, optional
+        If given, record the wall time of each stage of the read, counts of the
+        elements, species, expressions, phases, parameters and intervals read and
+        the slowest phases to parse.
+    fingerprint : Fingerprint, optional
+        If given, add every top-level node of the file to it, including those
+        that are not loaded because of `elements` or `phases`.
+    cancel_check : callable, optional
+        Called without arguments before each top-level element and each deferred
+        expression is converted. If it returns True, the read stops by raising
+        ``concurrent.futures.CancelledError``, leaving `dbf` partially read.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        For ``validate="deferred"``, a future for the background validation result. None otherwise.
+
+    Notes
+    -----
+    When selecting elements or phases, every element and species is still loaded,
+    but each Expr is only converted if a loaded parameter refers to it, directly or
+    through other Exprs.
+    """
+    stats = stats if stats is not None else NULL_STATS
+    fd = open_decompressed(fd)
+    if stream:
+        if validate not in (None, "off"):
+            raise ValueError("Schema validation is not supported when streaming. Use validate='off'.")
+        if phases is not None:
+            with stats.stage("select_phases"):
+                fd, parts = _prescan_disordered_parts(fd)
+            phases = close_phase_selection(phases, parts)
+        children = iter_root_children(fd)
+        if stats.enabled:
+            children = _timed_iter(children, stats, "parse")
+        validation = None
+    else:
+        parser = etree.XMLParser(load_dtd=False,
+                                 no_network=True)
+        with stats.stage("parse"):
+            tree = etree.parse(fd, parser=parser)
+        with stats.stage("validate"):
+            validation = _validate_tree(tree, validate or "warn", "Failed to validate database")
+        children = tree.getroot()
+        if phases is not None:
+            phases = close_phase_selection(phases, disordered_parts(children.iterchildren('Phase')))
+    if elements is not None:
+        elements = frozenset(str(el).upper() for el in elements)
+    prune_exprs = phases is not None or elements is not None
+    if lazy:
+        if not isinstance(dbf.symbols, LazySymbols):
+            dbf.symbols = LazySymbols(dbf.symbols)
+        dbf._parameters.table(dbf._parameters.default_table_name).document_class = LazyParameterDocument
+    context = ParseContext(dbf.species, phases=phases, elements=elements, lazy=lazy, stats=stats)
+    expr_nodes = []
+    parallel = workers is not None and workers > 1
+    phase_fragments = []  # parsed in the pool once all species are known
+    for child in children:
+        check_cancelled(cancel_check)
+        if fingerprint is not None:
+            with stats.stage("fingerprint"):
+                fingerprint.update(child)
+        if child.tag == 'Phase' and parallel:
+            if phases is None or str(child.get('id')) in phases:
+                phase_fragments.append(etree.tostring(child))
+        elif child.tag == 'Phase':
+            with stats.stage("phases"):
+                phase_data = parse_phase_data(context, child)
+            if phase_data is not None:
+                with stats.stage("add_parameter"):
+                    add_phase_data(dbf, phase_data)
+        elif child.tag == 'Expr':
+            if prune_exprs:
+                # Defer conversion until it is known which functions the selected parameters use
+                expr_nodes.append(deepcopy(child))
+            else:
+                with stats.stage("exprs"):
+                    parse_expr(dbf, child, lazy=lazy, stats=stats)
+        else:
+            parse_func = _root_child_parsers.get(child.tag)
+            if parse_func is not None:
+                species = parse_func(dbf, child)
+                if species is not None:
+                    context.add_species((species,))
+                    stats.count("elements" if child.tag == 'ChemicalElement' else "species")
+    if len(phase_fragments) > 0:
+        _read_phases_in_pool(dbf, context, phase_fragments, workers, cancel_check)
+    if prune_exprs:
+        with stats.stage("exprs"):
+            parse_referenced_exprs(dbf, expr_nodes, lazy=lazy, stats=stats, cancel_check=cancel_check)
+    with stats.stage("process_parameter_queue"):
+        dbf.process_parameter_queue()
+    return validation
+
+
+def _build_phase_node(root, name, phase_obj):
+    phase_node = objectify.SubElement(root, "Phase", id=str(name))
+    # All model hints must be consumed for the writing to be considered successful
+    model_hints = phase_obj.model_hints.copy()
+    possible_options = set(phase_options.keys()).intersection(model_hints.keys())
+    # TODO: extra parameters for QKTO
+    if "mqmqa" in model_hints:
+        # MQMQA model
+        hint = model_hints["mqmqa"]
+        model_node = objectify.SubElement(phase_node, "Model", type="MQMQA", version=hint["type"])
+
+        # ConstituentArray (MQMConstituentArray)
+        constit_array_node = objectify.SubElement(model_node, "ConstituentArray")
+        subl_idx = 0
+        # Don't loop over sublattices, they are reflective of cation/anion sublattices for MQMQA
+        for constituents in phase_obj.constituents:
+            # Site ratios are not relevant for MQMQA phases
+            site_node = objectify.SubElement(constit_array_node, "Site", id=str(subl_idx))
+            for constituent in sorted(constituents, key=str):
+                objectify.SubElement(site_node, "Constituent", refid=str(constituent))
+            subl_idx += 1
+
+        # ChemicalGroups
+        chemical_groups_node = objectify.SubElement(model_node, "ChemicalGroups")
+        cation_node = objectify.SubElement(chemical_groups_node, "Cations")
+        for constituent, group_id in hint["chemical_groups"]["cations"].items():
+                objectify.SubElement(cation_node, "Constituent", refid=str(constituent), groupid=str(group_id))
+        anion_node = objectify.SubElement(chemical_groups_node, "Anions")
+        for constituent, group_id in hint["chemical_groups"]["anions"].items():
+                objectify.SubElement(anion_node, "Constituent", refid=str(constituent), groupid=str(group_id))
+        del model_hints["mqmqa"]
+    else:
+        model_node = objectify.SubElement(phase_node, "Model", type="CEF")
+        constit_array_node = objectify.SubElement(model_node, "ConstituentArray")
+        subl_idx = 0
+        for site_ratio, constituents in zip(phase_obj.sublattices, phase_obj.constituents):
+            site_node = objectify.SubElement(constit_array_node, "Site", id=str(subl_idx), ratio=str(site_ratio))
+            for constituent in sorted(constituents, key=str):
+                objectify.SubElement(site_node, "Constituent", refid=str(constituent))
+            subl_idx += 1
+        # IHJ model
+        if 'ihj_magnetic_afm_factor' in model_hints.keys():
+            objectify.SubElement(model_node, "MagneticOrdering",
+                type="IHJ", structure_factor=str(model_hints['ihj_magnetic_structure_factor']),
+                afm_factor=str(model_hints['ihj_magnetic_afm_factor']))
+            del model_hints['ihj_magnetic_afm_factor']
+            del model_hints['ihj_magnetic_structure_factor']
+        # Two-part atomic ordering
+        if ('ordered_phase' in model_hints.keys()):
+            objectify.SubElement(model_node, "AtomicOrdering",
+                ordered_part=str(model_hints['ordered_phase']),
+                disordered_part=str(model_hints['disordered_phase']))
+            del model_hints['ordered_phase']
+            del model_hints['disordered_phase']
+        # Symmetry options
+        symmetry_node = None
+        if ('symmetry_FCC_4SL' in model_hints.keys()):
+            symmetry_node = objectify.SubElement(model_node, "Symmetry", type="FCC_4SL")
+            del model_hints['symmetry_FCC_4SL']
+        if ('symmetry_BCC_4SL' in model_hints.keys()):
+            if symmetry_node is not None:
+                raise ValueError('Multiple parameter symmetry options specified')
+            del model_hints['symmetry_BCC_4SL']
+        # ChemicalGroups
+        if "chemical_groups" in model_hints:
+            chemical_groups_node = objectify.SubElement(model_node, "ChemicalGroups")
+            for constituent, group_id in model_hints["chemical_groups"].items():
+                    objectify.SubElement(chemical_groups_node, "Constituent", refid=str(constituent), groupid=str(group_id))
+            del model_hints["chemical_groups"]
+        # Simple phase options
+        for possible_option in possible_options:
+            objectify.SubElement(model_node, phase_options[possible_option])
+            del model_hints[possible_option]
+    if len(model_hints) > 0:
+        # Some model hints were not properly consumed
+        raise ValueError('Not all model hints are supported: {}'.format(model_hints))
+    return phase_node
+
+
+def _build_parameter_node(phase_node, param):
+    param_node = objectify.SubElement(phase_node, "Parameter", type=str(param['parameter_type']))
+    if param.get("parameter_order") is not None:
+        order_node = objectify.SubElement(param_node, "Order")
+        order_node._setText(str(param['parameter_order']))
+    # Constituent array
+    constit_array_node = objectify.SubElement(param_node, "ConstituentArray")
+    subl_idx = 0
+    for constituents in param['constituent_array']:
+        site_node = objectify.SubElement(constit_array_node, "Site", refid=str(subl_idx))
+        for constituent in constituents:
+            objectify.SubElement(site_node, "Constituent", refid=str(constituent))
+        subl_idx += 1
+    if param['diffusing_species'] != v.Species(None):
+        objectify.SubElement(param_node, "DiffusingSpecies", refid=str(param['diffusing_species']))
+    # Handle unique aspects of MQMQA parameters
+    if param["parameter_type"] == "MQMG":
+        objectify.SubElement(param_node, "Zeta")._setText(str(param["zeta"]))
+        objectify.SubElement(param_node, "StoichiometricFactors")._setText(" ".join(map(str, param["stoichiometry"])))
+    elif param["parameter_type"] == "MQMZ":
+        coordinations_node = objectify.SubElement(param_node, "Coordinations")
+        coordinations_node._setText(" ".join(map(str, param["coordinations"])))
+    elif param["parameter_type"] == "MQMX":
+        objectify.SubElement(param_node, "MixingCode", type=param["mixing_code"])
+        objectify.SubElement(param_node, "Exponents")._setText(" ".join(map(str, param["exponents"])))
+        if param["additional_mixing_constituent"] != v.Species(None):
+            objectify.SubElement(param_node, "AdditionalMixingConstituent", refid=str(param["additional_mixing_constituent"]))
+            objectify.SubElement(param_node, "AdditionalMixingExponent")._setText(str(param["additional_mixing_exponent"]))
+    elif param["parameter_type"] == "QKT":
+        objectify.SubElement(param_node, "Exponents")._setText(" ".join(map(str, param["exponents"])))
+
+    if param.get("parameter") is not None:
+        nodes = convert_symbolic_to_nodes(param['parameter'])
+        for node in nodes:
+            if isinstance(node, str):
+                param_node._setText(node)
+            else:
+                param_node.append(node)
+    # TODO: param['reference']
+
+
+def _symbols_and_phase_parameters(dbf, hoist, stats):
+    # Symbols and parameters to write, the latter grouped by phase in document order.
+    # Phases without a definition are created implicitly, after the defined ones.
+    parameters = dbf._parameters.all()
+    symbols, replacements = dbf.symbols, {}
+    if hoist:
+        with stats.stage("hoist"):
+            symbols, replacements = hoist_common_subexpressions(dbf.symbols, (param['parameter'] for param in parameters))
+        stats.count("hoisted", len(symbols) - len(dbf.symbols))
+    phase_parameters = {name: [] for name in sorted(dbf.phases.keys())}
+    for param in parameters:
+        if len(replacements) > 0 and isinstance(param['parameter'], Basic):
+            param = dict(param, parameter=replace_subexpressions(param['parameter'], replacements))
+        phase_parameters.setdefault(param['phase_name'], []).append(param)
+    return symbols, phase_parameters
+
+
+def _build_phase_subtree(root, name, phase_obj, params):
+    if phase_obj is not None:
+        phase_node = _build_phase_node(root, name, phase_obj)
+    else:
+        phase_node = objectify.SubElement(root, "Phase", id=str(name))
+    for param in params:
+        _build_parameter_node(phase_node, param)
+    return phase_node
 
 
-def write_xml(dbf, fd, require_valid=True):
-    root = objectify.Element("Database", version=str(0))
+def _iter_header_nodes(dbf, root, symbols, stats=NULL_STATS):
+    # Build the children of the Database node that precede the phases in
+    # document order, yielding each top-level node once it is complete.
     metadata = objectify.SubElement(root, "metadata")
     writer = objectify.SubElement(metadata, "writer")
     writer._setText('pycalphad ' + str(pycalphad_version))
-    phase_nodes = {}
+    yield metadata
     for element in sorted(dbf.elements):
         ref = dbf.refstates.get(element, {})
         refphase = ref.get('phase', 'BLANK')
         mass = ref.get('mass', 0.0)
         H298 = ref.get('H298', 0.0)
         S298 = ref.get('S298', 0.0)
-        objectify.SubElement(root, "ChemicalElement", id=str(element), mass=str(mass),
-                             reference_phase=refphase, H298=str(H298), S298=str(S298))
+        stats.count("elements")
+        yield objectify.SubElement(root, "ChemicalElement", id=str(element), mass=str(mass),
+                                   reference_phase=refphase, H298=str(H298), S298=str(S298))
     for species in sorted(dbf.species, key=lambda s: s.name):
         if species.name not in dbf.elements:
             species_node = objectify.SubElement(root, "Species", id=str(species.name), charge=str(species.charge))
             for el_name, ratio in sorted(species.constituents.items(), key=lambda t: t[0]):
                 objectify.SubElement(species_node, "ChemicalElement", refid=str(el_name), ratio=str(ratio))
-    for name, expr in sorted(dbf.symbols.items()):
-        expr_node = objectify.SubElement(root, "Expr", id=str(name))
-        converted_nodes = convert_symbolic_to_nodes(expr)
-        for node in converted_nodes:
-            if isinstance(node, str):
-                expr_node._setText(node)
-            else:
-                expr_node.append(node)
-    for name, phase_obj in sorted(dbf.phases.items()):
-        if phase_nodes.get(name, None) is None:
-            phase_nodes[name] = objectify.SubElement(root, "Phase", id=str(name))
-        # All model hints must be consumed for the writing to be considered successful
-        model_hints = phase_obj.model_hints.copy()
-        possible_options = set(phase_options.keys()).intersection(model_hints.keys())
-        # TODO: extra parameters for QKTO
-        if "mqmqa" in model_hints:
-            # MQMQA model
-            hint = model_hints["mqmqa"]
-            model_node = objectify.SubElement(phase_nodes[name], "Model", type="MQMQA", version=hint["type"])
-
-            # ConstituentArray (MQMConstituentArray)
-            constit_array_node = objectify.SubElement(model_node, "ConstituentArray")
-            subl_idx = 0
-            # Don't loop over sublattices, they are reflective of cation/anion sublattices for MQMQA
-            for constituents in phase_obj.constituents:
-                # Site ratios are not relevant for MQMQA phases
-                site_node = objectify.SubElement(constit_array_node, "Site", id=str(subl_idx))
-                for constituent in sorted(constituents, key=str):
-                    objectify.SubElement(site_node, "Constituent", refid=str(constituent))
-                subl_idx += 1
-
-            # ChemicalGroups
-            chemical_groups_node = objectify.SubElement(model_node, "ChemicalGroups")
-            cation_node = objectify.SubElement(chemical_groups_node, "Cations")
-            for constituent, group_id in hint["chemical_groups"]["cations"].items():
-                    objectify.SubElement(cation_node, "Constituent", refid=str(constituent), groupid=str(group_id))
-            anion_node = objectify.SubElement(chemical_groups_node, "Anions")
-            for constituent, group_id in hint["chemical_groups"]["anions"].items():
-                    objectify.SubElement(anion_node, "Constituent", refid=str(constituent), groupid=str(group_id))
-            del model_hints["mqmqa"]
-        else:
-            model_node = objectify.SubElement(phase_nodes[name], "Model", type="CEF")
-            constit_array_node = objectify.SubElement(model_node, "ConstituentArray")
-            subl_idx = 0
-            for site_ratio, constituents in zip(phase_obj.sublattices, phase_obj.constituents):
-                site_node = objectify.SubElement(constit_array_node, "Site", id=str(subl_idx), ratio=str(site_ratio))
-                for constituent in sorted(constituents, key=str):
-                    objectify.SubElement(site_node, "Constituent", refid=str(constituent))
-                subl_idx += 1
-            # IHJ model
-            if 'ihj_magnetic_afm_factor' in model_hints.keys():
-                objectify.SubElement(model_node, "MagneticOrdering",
-                    type="IHJ", structure_factor=str(model_hints['ihj_magnetic_structure_factor']),
-                    afm_factor=str(model_hints['ihj_magnetic_afm_factor']))
-                del model_hints['ihj_magnetic_afm_factor']
-                del model_hints['ihj_magnetic_structure_factor']
-            # Two-part atomic ordering
-            if ('ordered_phase' in model_hints.keys()):
-                objectify.SubElement(model_node, "AtomicOrdering",
-                    ordered_part=str(model_hints['ordered_phase']),
-                    disordered_part=str(model_hints['disordered_phase']))
-                del model_hints['ordered_phase']
-                del model_hints['disordered_phase']
-            # Symmetry options
-            symmetry_node = None
-            if ('symmetry_FCC_4SL' in model_hints.keys()):
-                symmetry_node = objectify.SubElement(model_node, "Symmetry", type="FCC_4SL")
-                del model_hints['symmetry_FCC_4SL']
-            if ('symmetry_BCC_4SL' in model_hints.keys()):
-                if symmetry_node is not None:
-                    raise ValueError('Multiple parameter symmetry options specified')
-                del model_hints['symmetry_BCC_4SL']
-            # ChemicalGroups
-            if "chemical_groups" in model_hints:
-                chemical_groups_node = objectify.SubElement(model_node, "ChemicalGroups")
-                for constituent, group_id in model_hints["chemical_groups"].items():
-                        objectify.SubElement(chemical_groups_node, "Constituent", refid=str(constituent), groupid=str(group_id))
-                del model_hints["chemical_groups"]
-            # Simple phase options
-            for possible_option in possible_options:
-                objectify.SubElement(model_node, phase_options[possible_option])
-                del model_hints[possible_option]
-        if len(model_hints) > 0:
-            # Some model hints were not properly consumed
-            raise ValueError('Not all model hints are supported: {}'.format(model_hints))
-
-    for param in dbf._parameters.all():
-        phase_name = param['phase_name']
-        # Create phase implicitly if not defined
-        if phase_nodes.get(phase_name, None) is None:
-            phase_nodes[phase_name] = objectify.SubElement(root, "Phase", id=str(phase_name))
-        phase_node = phase_nodes[phase_name]
-        param_node = objectify.SubElement(phase_node, "Parameter", type=str(param['parameter_type']))
-        if param.get("parameter_order") is not None:
-            order_node = objectify.SubElement(param_node, "Order")
-            order_node._setText(str(param['parameter_order']))
-        # Constituent array
-        constit_array_node = objectify.SubElement(param_node, "ConstituentArray")
-        subl_idx = 0
-        for constituents in param['constituent_array']:
-            site_node = objectify.SubElement(constit_array_node, "Site", refid=str(subl_idx))
-            for constituent in constituents:
-                objectify.SubElement(site_node, "Constituent", refid=str(constituent))
-            subl_idx += 1
-        if param['diffusing_species'] != v.Species(None):
-            objectify.SubElement(param_node, "DiffusingSpecies", refid=str(param['diffusing_species']))
-        # Handle unique aspects of MQMQA parameters
-        if param["parameter_type"] == "MQMG":
-            objectify.SubElement(param_node, "Zeta")._setText(str(param["zeta"]))
-            objectify.SubElement(param_node, "StoichiometricFactors")._setText(" ".join(map(str, param["stoichiometry"])))
-        elif param["parameter_type"] == "MQMZ":
-            coordinations_node = objectify.SubElement(param_node, "Coordinations")
-            coordinations_node._setText(" ".join(map(str, param["coordinations"])))
-        elif param["parameter_type"] == "MQMX":
-            objectify.SubElement(param_node, "MixingCode", type=param["mixing_code"])
-            objectify.SubElement(param_node, "Exponents")._setText(" ".join(map(str, param["exponents"])))
-            if param["additional_mixing_constituent"] != v.Species(None):
-                objectify.SubElement(param_node, "AdditionalMixingConstituent", refid=str(param["additional_mixing_constituent"]))
-                objectify.SubElement(param_node, "AdditionalMixingExponent")._setText(str(param["additional_mixing_exponent"]))
-        elif param["parameter_type"] == "QKT":
-            objectify.SubElement(param_node, "Exponents")._setText(" ".join(map(str, param["exponents"])))
-
-        if param.get("parameter") is not None:
-            nodes = convert_symbolic_to_nodes(param['parameter'])
-            for node in nodes:
+            stats.count("species")
+            yield species_node
+    for name, expr in sorted(symbols.items()):
+        with stats.stage("exprs"):
+            expr_node = objectify.SubElement(root, "Expr", id=str(name))
+            converted_nodes = convert_symbolic_to_nodes(expr)
+            for node in converted_nodes:
                 if isinstance(node, str):
-                    param_node._setText(node)
+                    expr_node._setText(node)
                 else:
-                    param_node.append(node)
-        # TODO: param['reference']
+                    expr_node.append(node)
+        stats.count("exprs")
+        yield expr_node
+
+
+def _iter_database_nodes(dbf, root, stats=NULL_STATS, hoist=False):
+    # Build the children of the Database node in document order, yielding each
+    # top-level node once it is complete.
+    symbols, phase_parameters = _symbols_and_phase_parameters(dbf, hoist, stats)
+    yield from _iter_header_nodes(dbf, root, symbols, stats)
+    for name, params in phase_parameters.items():
+        with stats.phase(name), stats.stage("phases"):
+            phase_node = _build_phase_subtree(root, name, dbf.phases.get(name), params)
+        stats.count("phases")
+        stats.count("parameters", len(params))
+        yield phase_node
+
+
+_VALIDATION_SKELETON = """<Database version="0">
+  <ChemicalElement id="_" mass="0.0" reference_phase="_" H298="0.0" S298="0.0"/>
+  <Phase id="_"><Model type="CEF"><ConstituentArray><Site id="0" ratio="1.0"><Constituent refid="_"/></Site></ConstituentArray></Model></Phase>
+</Database>"""
+
+
+def _validate_subtree(node, mode):
+    # Validate a single top-level node by placing it in a minimal valid database
+    if mode == "off":
+        return None
+    skeleton = etree.fromstring(_VALIDATION_SKELETON)
+    skeleton.append(deepcopy(node))
+    return _validate_tree(skeleton, mode, "Failed to validate constructed {} node {}".format(node.tag, node.get("id", "")))
+
+
+def _indent(node, level):
+    # Indent like libxml2 pretty printing, which leaves the content of elements with text untouched.
+    # Objectified elements iterate over their siblings and do not allow setting their text directly.
+    children = list(node.iterchildren())
+    if len(children) == 0 or node.text is not None or any(child.tail is not None for child in children):
+        return
+    etree.ElementBase.text.__set__(node, "\n" + "  " * (level + 1))
+    for child in children:
+        _indent(child, level + 1)
+        child.tail = "\n" + "  " * (level + 1)
+    child.tail = "\n" + "  " * level
+
+
+def _prepare_node(node, validate, stats=NULL_STATS):
+    # Clean up and validate a detached top-level node, and indent it as it appears in the pretty printed document
+    objectify.deannotate(node, xsi_nil=True)
+    etree.cleanup_namespaces(node)
+    with stats.stage("validate"):
+        _validate_subtree(node, validate)
+    _indent(node, 1)
+
+
+class _TextWriter(object):
+    # Adapt a text file for etree.xmlfile and serialized documents, which are encoded bytes
+    def __init__(self, fd):
+        self.fd = fd
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def write(self, data):
+        self.fd.write(self.decoder.decode(data))
+
+
+def _byte_writer(fd):
+    # Binary files are written to directly, anything else is assumed to be a text file
+    if isinstance(fd, (io.RawIOBase, io.BufferedIOBase)):
+        return fd
+    return _TextWriter(fd)
+
+
+_write_worker_state = None
+
+
+def _init_write_worker(phase_parameters, phases, validate, digest=False):
+    # Process pool initializer. Worker processes receive the phases to write once,
+    # and without pickling them at all when they are forked, instead of once per task.
+    global _write_worker_state
+    _write_worker_state = (phase_parameters, phases, validate, digest)
+
+
+def _serialize_phase(name):
+    # Process pool entry point: build and serialize a Phase node and its parameters,
+    # along with its fingerprint digest if requested
+    phase_parameters, phases, validate, digest = _write_worker_state
+    root = objectify.Element("Database", version=str(0), nsmap={})
+    phase_node = _build_phase_subtree(root, name, phases.get(name), phase_parameters[name])
+    root.remove(phase_node)
+    _prepare_node(phase_node, validate)
+    return etree.tostring(phase_node), node_digest(phase_node) if digest else None
+
+
+def _database_fingerprint(dbf, hoist=False, cancel_check=None):
+    fingerprint = Fingerprint()
+    root = objectify.Element("Database", version=str(0), nsmap={})
+    for node in _iter_database_nodes(dbf, root, hoist=hoist):
+        check_cancelled(cancel_check)
+        root.remove(node)
+        objectify.deannotate(node, xsi_nil=True)
+        etree.cleanup_namespaces(node)
+        fingerprint.update(node)
+    return fingerprint
+
+
+def database_fingerprint(dbf, hoist=False):
+    """Canonical fingerprint of a Database as ``write_xml`` writes it.
+
+    It is equal to the fingerprint of the files written by ``write_xml`` from
+    an equal Database, whatever their formatting and the order of their nodes.
+    Other files that read to the same database, e.g. with values or
+    expressions written differently, may have other fingerprints. See
+    ``pycalphad_xml.fingerprint.Fingerprint``.
+
+    This is not cheap: the XML nodes are built as by ``write_xml``, only
+    without serializing them, so it takes about as long as writing the
+    database and longer than reading it back.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to fingerprint.
+    hoist : bool, optional
+        Fingerprint the database as written with ``hoist=True``.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest.
+    """
+    return _database_fingerprint(dbf, hoist).hexdigest()
+
+
+def file_fingerprint(fd, fingerprint=None):
+    """Canonical fingerprint of an XML database file, without converting its contents.
+
+    The file is parsed incrementally, so memory use is bounded as when reading
+    with ``stream=True``.
+
+    Parameters
+    ----------
+    fd : file-like
+        File descriptor to read from, optionally compressed.
+    fingerprint : Fingerprint, optional
+        If given, add the top-level nodes of the file to it, as ``read_xml`` does.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest, as returned by ``database_fingerprint``.
+    """
+    fingerprint = fingerprint if fingerprint is not None else Fingerprint()
+    for node in iter_root_children(open_decompressed(fd)):
+        fingerprint.update(node)
+    return fingerprint.hexdigest()
+
+
+def _existing_fingerprint(fd):
+    # Fingerprint of the current contents of a file open for reading and writing,
+    # or None if it is empty or not a database
+    if not (fd.readable() and fd.seekable()):
+        raise ValueError("skip_unchanged requires a seekable file open for reading and writing, e.g. with mode 'r+'")
+    fd.seek(0)
+    try:
+        return file_fingerprint(fd)
+    except etree.XMLSyntaxError:
+        return None
+
+
+def write_xml(dbf, fd, require_valid=True, validate=None, stream=False, stats=None, compression="infer", hoist=False,
+              workers=None, fingerprint=None, skip_unchanged=False, cancel_check=None):
+    """Write a Database object as XML.
+
+    Parameters
+    ----------
+    dbf : Database
+        Database to write.
+    fd : file-like
+        Text or binary file to write to. Binary files are written the UTF-8
+        encoded document directly.
+    require_valid : bool, optional
+        If True (default), raise if the constructed database fails validation, otherwise log a warning.
+        Ignored if ``validate`` is given.
+    validate : str, optional
+        Schema validation mode, one of ``"strict"``, ``"warn"``, ``"off"`` or ``"deferred"``.
+        Defaults to ``"strict"`` or ``"warn"``, depending on ``require_valid``.
+    stream : bool, optional
+        If True, serialize each phase, expression and other top-level node
+        through ``etree.xmlfile`` as soon as it is built, so memory use does not
+        grow with the size of the database. The output is identical. Nodes are validated individually,
+        so ``validate="deferred"`` is not supported and a failure in strict
+        mode leaves a partially written file.
+    stats : Stats, optional
+        If given, record the wall time of each stage of the write, counts of the
+        elements, species, expressions, phases and parameters written and the
+        slowest phases to build.
+    compression : str, optional
+        Compress the output with ``"gzip"``, ``"bz2"`` or ``"xz"``, which requires
+        `fd` to be a binary file or a text file backed by one. By default, the
+        compression is inferred from the extension of the file name, so that
+        ``dbf.to_file("db.xml.gz")`` writes a gzip compressed file. None for no compression.
+    hoist : bool, optional
+        If True, write each subexpression that is repeated across symbols and
+        parameter values once, as an Expr that the other expressions refer to,
+        and refer to existing symbols wherever their value is inlined. The
+        Database read back evaluates to the same values, but its parameters
+        refer to symbols instead of holding the full expressions. New Exprs are
+        named ``CSE1``, ``CSE2``... See ``hoist_common_subexpressions``.
+    workers : int, optional
+        If greater than one, build and serialize the phases and their parameters
+        in a pool of this many processes. The output is identical to a serial
+        write. As when streaming, nodes are validated individually and
+        ``validate="deferred"`` is not supported.
+    fingerprint : Fingerprint, optional
+        If given, add every top-level node written to it.
+    skip_unchanged : bool, optional
+        If True, leave `fd` untouched if its current contents have the same
+        fingerprint as the database, e.g. so that the modification time of a
+        regenerated file only changes when its contents do. Otherwise the file
+        is truncated and written. `fd` must be seekable and open for reading
+        and writing, e.g. with mode ``"r+"``, or ``"a+"`` to also create it.
+        This saves the disk write, not the work: the XML nodes are built for
+        the comparison as by ``database_fingerprint``, which costs about as
+        much as writing, and again to write them if the database changed.
+    cancel_check : callable, optional
+        Called without arguments after each top-level node is built. If it
+        returns True, the write stops by raising ``concurrent.futures.CancelledError``,
+        leaving a partially written file if streaming or writing in parallel.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        For ``validate="deferred"``, a future for the background validation result. None otherwise.
+    """
+    stats = stats if stats is not None else NULL_STATS
+    if skip_unchanged:
+        with stats.stage("fingerprint"):
+            current = _database_fingerprint(dbf, hoist, cancel_check)
+            unchanged = _existing_fingerprint(fd) == current.hexdigest()
+        if unchanged:
+            stats.count("unchanged")
+            if fingerprint is not None:
+                fingerprint.merge(current)
+            return None
+        fd.seek(0)
+        fd.truncate()
+    if compression == "infer":
+        compression = infer_compression(getattr(fd, "name", None))
+    if compression is not None:
+        with open_compressed(fd, compression) as text_fd:
+            # Write the encoded document to the compressor directly
+            return write_xml(dbf, text_fd.buffer, require_valid=require_valid, validate=validate, stream=stream,
+                             stats=stats, compression=None, hoist=hoist, workers=workers, fingerprint=fingerprint,
+                             cancel_check=cancel_check)
+    if validate is None:
+        validate = "strict" if require_valid else "warn"
+    parallel = workers is not None and workers > 1
+    if stream and validate == "deferred":
+        raise ValueError('Deferred validation is not supported when streaming')
+    if parallel and validate == "deferred":
+        raise ValueError('Deferred validation is not supported when writing in parallel')
+    root = objectify.Element("Database", version=str(0), nsmap={})
+    header = (b'<?xml version="1.0"?>\n'
+              # XXX: href needs to be changed
+              b'<?xml-model href="database.rng" schematypens="http://relaxng.org/ns/structure/1.0" type="application/xml"?>\n')
+    out = _byte_writer(fd)
+    if parallel:
+        # The phases arrive serialized from the workers, so the document is assembled
+        # from serialized nodes instead of through etree.xmlfile
+        out.write(header)
+        out.write(b'<Database version="0">')
+        symbols, phase_parameters = _symbols_and_phase_parameters(dbf, hoist, stats)
+        for node in _iter_header_nodes(dbf, root, symbols, stats):
+            check_cancelled(cancel_check)
+            root.remove(node)
+            _prepare_node(node, validate, stats)
+            with stats.stage("serialize"):
+                out.write(b"\n  " + etree.tostring(node))
+            if fingerprint is not None:
+                with stats.stage("fingerprint"):
+                    fingerprint.update(node)
+        names = list(phase_parameters)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_write_worker,
+                                 initargs=(phase_parameters, dbf.phases, validate,
+                                           fingerprint is not None)) as executor:
+            # Results are returned in submission order, so the phases are written in document order
+            fragments = executor.map(_serialize_phase, names, chunksize=max(1, len(names) // (4 * workers)))
+            try:
+                for name in names:
+                    check_cancelled(cancel_check)
+                    with stats.stage("phases"):
+                        fragment, digest = next(fragments)
+                    if fingerprint is not None:
+                        fingerprint.update_digest(digest)
+                    stats.count("phases")
+                    stats.count("parameters", len(phase_parameters[name]))
+                    out.write(b"\n  " + fragment)
+            except CancelledError:
+                executor.shutdown(cancel_futures=True)
+                raise
+        out.write(b"\n</Database>\n")
+        return None
+    if stream:
+        out.write(header)
+        with etree.xmlfile(out, encoding="utf-8") as xf:
+            with xf.element("Database", version=str(0)):
+                for node in _iter_database_nodes(dbf, root, stats, hoist):
+                    check_cancelled(cancel_check)
+                    # Detach each node once built so that memory use stays constant
+                    root.remove(node)
+                    _prepare_node(node, validate, stats)
+                    with stats.stage("serialize"):
+                        xf.write("\n  ")
+                        xf.write(node)
+                    if fingerprint is not None:
+                        with stats.stage("fingerprint"):
+                            fingerprint.update(node)
+                xf.write("\n")
+        out.write(b"\n")
+        return None
+
+    for _ in _iter_database_nodes(dbf, root, stats, hoist):
+        check_cancelled(cancel_check)
     objectify.deannotate(root, xsi_nil=True)
     etree.cleanup_namespaces(root)
+    if fingerprint is not None:
+        with stats.stage("fingerprint"):
+            for node in root.iterchildren():
+                fingerprint.update(node)
 
     # Validate
-    relaxng = etree.RelaxNG(etree.parse(this_dir / 'database.rng'))
-    if not relaxng.validate(root):
-        if require_valid:
-            raise ValueError("Failed to validate constructed database", relaxng.error_log)
-        else:
-            logger.warning("Failed to validate constructed database:\n %s", str(relaxng.error_log))
+    with stats.stage("validate"):
+        validation = _validate_tree(root, validate, "Failed to validate constructed database")
 
-    fd.write('<?xml version="1.0"?>\n')
-    # XXX: href needs to be changed
-    fd.write('<?xml-model href="database.rng" schematypens="http://relaxng.org/ns/structure/1.0" type="application/xml"?>\n')
-    fd.write(etree.tostring(root, pretty_print=True).decode("utf-8"))
+    with stats.stage("serialize"):
+        out.write(header)
+        out.write(etree.tostring(root, pretty_print=True))
+    return validation
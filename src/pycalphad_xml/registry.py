@@ -0,0 +1,184 @@
+"""
+In-process registry of loaded Databases, shared between callers and revalidated against their files.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from pycalphad import Database
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from pycalphad_xml.parser import read_xml
+
+DEFAULT_MAX_ENTRIES = 16
+# Collectors of a single read, which a load served from the registry would leave empty
+_PER_READ_KWARGS = ("stats", "fingerprint")
+
+RegistryInfo = namedtuple('RegistryInfo', ['hits', 'misses', 'reloads', 'entries', 'size'])
+_Entry = namedtuple('_Entry', ['version', 'dbf', 'size'])
+
+
+def _file_version(path):
+    # Cheap check for changes to a file: its modification time and size
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_kwargs_key(read_kwargs):
+    return tuple(sorted((key, tuple(sorted(value)) if isinstance(value, (set, frozenset, list, tuple)) else value)
+                        for key, value in read_kwargs.items()))
+
+
+def copy_database(dbf):
+    """Copy of a Database that can be modified without affecting the original.
+
+    The containers of the Database, i.e. its sets, dictionaries and parameter
+    table, are copied. The objects they hold, such as Species, phases and
+    SymEngine expressions, are shared, so they must not be modified in place.
+    """
+    copied = Database()
+    for key, value in dbf.__dict__.items():
+        if key == '_parameters':
+            copied._parameters = TinyDB(storage=MemoryStorage)
+            copied._parameters.insert_multiple(dict(param) for param in value.all())
+        elif isinstance(value, (dict, set, list)):
+            setattr(copied, key, copy.copy(value))
+        else:
+            setattr(copied, key, value)
+    return copied
+
+
+class DatabaseRegistry(object):
+    """Thread-safe cache of Databases loaded from files, keyed by path and read options.
+
+    Each load checks the modification time and size of the file and reads it
+    again if either changed. The least recently used entries are evicted once
+    there are more than `max_entries` of them, or once the files of the cached
+    entries add up to more than `max_size` bytes. File size is used as an
+    estimate of the memory held by a Database, which grows in proportion to it.
+
+    Concurrent loads of the same file read it once; the other callers wait for
+    the result. Loads of different files proceed in parallel.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of cached Databases.
+    max_size : int, optional
+        Maximum total size, in bytes, of the files of the cached Databases. Unlimited by default.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_size=None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries = OrderedDict()  # least recently used first
+        self._loading = {}  # key -> lock held while the file is read
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._reloads = 0
+
+    def load(self, path, copy=False, **read_kwargs):
+        """Database read from `path`, shared with all other loads of the same file with the same options.
+
+        Parameters
+        ----------
+        path : str or PathLike
+            Database file. Files in formats other than XML are read with
+            ``Database(path)``, and require that no `read_kwargs` are given.
+        copy : bool, optional
+            If False (default), return the shared Database, which must not be
+            modified. If True, return a copy made with ``copy_database``.
+        read_kwargs :
+            Keyword arguments passed to ``read_xml``, e.g. ``phases`` or ``lazy``.
+            ``cancel_check`` only applies to this load if it reads the file, and is
+            not part of the options that loads are shared by. ``stats`` and
+            ``fingerprint`` are not supported.
+
+        Returns
+        -------
+        Database
+        """
+        unsupported = sorted(set(_PER_READ_KWARGS).intersection(read_kwargs))
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)} cannot be collected by loads that share a Database")
+        cancel_check = read_kwargs.pop("cancel_check", None)
+        path = os.path.realpath(path)
+        key = (path, _read_kwargs_key(read_kwargs))
+        version = _file_version(path)
+        dbf = self._lookup(key, version)
+        if dbf is None:
+            with self._lock:
+                key_lock = self._loading.setdefault(key, threading.Lock())
+            with key_lock:
+                # Another thread may have read the file while this one waited
+                dbf = self._lookup(key, version, count=False)
+                if dbf is None:
+                    try:
+                        dbf = self._read(path, read_kwargs, cancel_check)
+                        with self._lock:
+                            self._store(key, _Entry(version, dbf, version[1]))
+                    finally:
+                        # Also if the read failed, so that the lock of the key is not kept forever
+                        with self._lock:
+                            if self._loading.get(key) is key_lock:
+                                del self._loading[key]
+        return copy_database(dbf) if copy else dbf
+
+    def _lookup(self, key, version, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.dbf
+            if count:
+                if entry is None:
+                    self._misses += 1
+                else:
+                    self._reloads += 1
+            return None
+
+    @staticmethod
+    def _read(path, read_kwargs, cancel_check=None):
+        if len(read_kwargs) == 0 and cancel_check is None:
+            return Database(path)
+        dbf = Database()
+        with open(path) as fd:
+            read_xml(dbf, fd, cancel_check=cancel_check, **read_kwargs)
+        return dbf
+
+    def _store(self, key, entry):
+        # Requires self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        total_size = sum(entry.size for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                          (self.max_size is not None and total_size > self.max_size)):
+            _, evicted = self._entries.popitem(last=False)
+            total_size -= evicted.size
+
+    def invalidate(self, path=None):
+        """Remove the Databases read from `path`, with any options, or all Databases if `path` is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = os.path.realpath(path)
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def info(self):
+        """Hits, misses, reloads of changed files, number of entries and total file size of the entries."""
+        with self._lock:
+            return RegistryInfo(self._hits, self._misses, self._reloads, len(self._entries),
+                                sum(entry.size for entry in self._entries.values()))
+
+
+DEFAULT_REGISTRY = DatabaseRegistry()
+
+
+def load_cached(path, copy=False, **read_kwargs):
+    """Load a Database through ``DEFAULT_REGISTRY``, reusing it for as long as the file is unchanged.
+
+    Repeated loads of an unchanged file only cost a ``stat`` call. See
+    ``DatabaseRegistry.load`` for the parameters.
+    """
+    return DEFAULT_REGISTRY.load(path, copy=copy, **read_kwargs)
@@ -0,0 +1,117 @@
+"""
+Collection of timings and counts while reading and writing databases.
+"""
+import heapq
+import json
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+class Stats(object):
+    """Wall time per stage, counts of processed objects and the slowest phases of a read or write.
+
+    Pass an instance as ``stats=`` to ``read_xml`` or ``write_xml``. The same
+    instance can be passed to several calls to accumulate their statistics.
+    Stages can be nested, e.g. the ``"convert"`` stage of converting values to
+    expressions is part of the ``"phases"`` and ``"exprs"`` stages, so the stage
+    times do not add up to the total.
+
+    Parameters
+    ----------
+    n_slowest : int, optional
+        Number of slowest phases to keep.
+    """
+    enabled = True
+
+    def __init__(self, n_slowest=10):
+        self.n_slowest = n_slowest
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._slowest_phases = []  # min-heap of (seconds, phase name)
+
+    @contextmanager
+    def stage(self, name):
+        "Add the wall time spent in the block to the named stage."
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += perf_counter() - start
+
+    @contextmanager
+    def phase(self, name):
+        "Record the wall time spent in the block on the named phase."
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, perf_counter() - start)
+
+    def count(self, name, n=1):
+        "Add `n` to the named counter."
+        self.counts[name] += n
+
+    def record_phase(self, name, seconds):
+        entry = (seconds, name)
+        if len(self._slowest_phases) < self.n_slowest:
+            heapq.heappush(self._slowest_phases, entry)
+        elif entry > self._slowest_phases[0]:
+            heapq.heapreplace(self._slowest_phases, entry)
+
+    @property
+    def slowest_phases(self):
+        "List of (phase name, seconds) of the slowest phases, slowest first."
+        return [(name, seconds) for seconds, name in sorted(self._slowest_phases, reverse=True)]
+
+    def merge(self, other):
+        "Add the statistics collected by another Stats object, e.g. in a worker process."
+        for name, seconds in other.times.items():
+            self.times[name] += seconds
+        for name, n in other.counts.items():
+            self.counts[name] += n
+        for seconds, name in other._slowest_phases:
+            self.record_phase(name, seconds)
+
+    def as_dict(self):
+        return {
+            "times": dict(self.times),
+            "counts": dict(self.counts),
+            "slowest_phases": [{"phase": name, "time": seconds} for name, seconds in self.slowest_phases],
+        }
+
+    def to_json(self, **kwargs):
+        "Statistics as a JSON string. Keyword arguments are passed to ``json.dumps``."
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def __str__(self):
+        lines = ["{:<24} {:>10.4f} s".format(name, seconds) for name, seconds in self.times.items()]
+        lines += ["{:<24} {:>10d}".format(name, n) for name, n in self.counts.items()]
+        if len(self._slowest_phases) > 0:
+            lines.append("slowest phases:")
+            lines += ["  {:<22} {:>10.4f} s".format(name, seconds) for name, seconds in self.slowest_phases]
+        return "\n".join(lines)
+
+
+class _NullStats(object):
+    # Stand-in when statistics are not collected, so instrumented code needs no branches
+    enabled = False
+    _null_context = nullcontext()
+
+    def stage(self, name):
+        return self._null_context
+
+    def phase(self, name):
+        return self._null_context
+
+    def count(self, name, n=1):
+        pass
+
+    def record_phase(self, name, seconds):
+        pass
+
+    def merge(self, other):
+        pass
+
+
+NULL_STATS = _NullStats()
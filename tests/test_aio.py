@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import pytest
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.aio import load_database as load_database_async, read_xml_async, save_database
+from pycalphad_xml.stats import Stats
+
+
+class _BlockingStats(Stats):
+    # Blocks the first phase until released, to cancel a read while it is in progress
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def phase(self, name):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(timeout=60)
+        return super().phase(name)
+
+
+@pytest.mark.parametrize("load_database", ["alni_dupin_2001.tdb", "Kaye_Pd-Ru-Tc-Mo.dat"], indirect=True)
+def test_concurrent_load_and_save(load_database, tmp_path):
+    """Databases saved and loaded concurrently match the originals"""
+    dbf = load_database()
+    paths = [tmp_path / "db.xml", tmp_path / "db.xml.gz"]
+
+    async def round_trip():
+        await asyncio.gather(*(save_database(dbf, path) for path in paths))
+        return await asyncio.gather(*(load_database_async(path) for path in paths))
+
+    loaded = asyncio.run(round_trip())
+    expected = Database.from_string(dbf.to_string(fmt="xml"), fmt="xml")
+    assert all(loaded_dbf == expected for loaded_dbf in loaded)
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_cancelled_read_stops(load_database):
+    """Cancelling a read stops it in its executor at the next phase"""
+    xml_str = load_database().to_string(fmt="xml")
+    stats = _BlockingStats()
+    dbf = Database()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def cancel_read():
+        task = asyncio.create_task(read_xml_async(dbf, StringIO(xml_str), executor=executor, stats=stats))
+        await asyncio.get_running_loop().run_in_executor(None, stats.started.wait, 60)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        stats.release.set()
+
+    asyncio.run(cancel_read())
+    executor.shutdown(wait=True)
+    assert len(dbf.phases) <= 1
+    assert len(dbf._parameters) == 0
+
+
+@select_database("alfe.tdb")
+def test_cancelled_save_leaves_file_unchanged(load_database, tmp_path):
+    path = tmp_path / "db.xml"
+    path.write_text("previous contents")
+    stats = _BlockingStats()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def cancel_save():
+        task = asyncio.create_task(save_database(load_database(), path, executor=executor, stats=stats))
+        await asyncio.get_running_loop().run_in_executor(None, stats.started.wait, 60)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        stats.release.set()
+
+    asyncio.run(cancel_save())
+    executor.shutdown(wait=True)
+    assert path.read_text() == "previous contents"
+    assert [p.name for p in tmp_path.iterdir()] == ["db.xml"]
+
+
+@select_database("alfe.tdb")
+def test_caller_cancel_check_is_kept(load_database):
+    """A cancel_check passed by the caller still stops reads run as coroutines, which are then cancelled"""
+    xml_str = load_database().to_string(fmt="xml")
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(read_xml_async(Database(), StringIO(xml_str), cancel_check=lambda: True))
+    dbf = Database()
+    asyncio.run(read_xml_async(dbf, StringIO(xml_str), cancel_check=lambda: False))
+    assert len(dbf.phases) > 0
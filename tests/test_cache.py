@@ -0,0 +1,67 @@
+import pytest
+from io import StringIO
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+import pycalphad_xml.cache
+from pycalphad_xml.cache import read_xml_cached, evict
+from pycalphad_xml.fingerprint import Fingerprint
+from pycalphad_xml.parser import file_fingerprint
+from pycalphad_xml.stats import Stats
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_cached_read_reuses_stored_database(load_database, tmp_path, monkeypatch):
+    """A second read of the same contents is loaded from the cache and compares equal"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf = Database()
+    read_xml_cached(dbf, StringIO(xml_str), cache_dir=tmp_path)
+    assert dbf == Database.from_string(xml_str, fmt="xml")
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("read_xml should not be called on a cache hit")
+    monkeypatch.setattr(pycalphad_xml.cache, "read_xml", fail)
+    dbf_cached = Database()
+    stats, fingerprint = Stats(), Fingerprint()
+    read_xml_cached(dbf_cached, StringIO(xml_str), cache_dir=tmp_path, stats=stats, fingerprint=fingerprint)
+    assert dbf_cached == dbf
+    assert stats.counts["cache_hits"] == 1
+    assert fingerprint.hexdigest() == file_fingerprint(StringIO(xml_str))
+
+
+@select_database("alfe.tdb")
+def test_cached_lazy_read_is_rejected(load_database, tmp_path):
+    with pytest.raises(ValueError):
+        read_xml_cached(Database(), StringIO(load_database().to_string(fmt="xml")), cache_dir=tmp_path, lazy=True)
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_cache_keys_depend_on_contents_and_options(load_database, tmp_path):
+    """Different contents or subsets get separate entries and the least recently used are evicted"""
+    xml_str = load_database().to_string(fmt="xml")
+    read_xml_cached(Database(), StringIO(xml_str), cache_dir=tmp_path)
+    read_xml_cached(Database(), StringIO(xml_str), cache_dir=tmp_path, phases=["LIQUID"])
+    read_xml_cached(Database(), StringIO(xml_str.replace("GHSERAL", "GHSERAL2")), cache_dir=tmp_path)
+    entries = list(tmp_path.glob("*.pickle"))
+    assert len(entries) == 3
+    entry_size = max(entry.stat().st_size for entry in entries)
+    evict(tmp_path, max_size=entry_size)
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+
+def test_unreadable_cache_entries_are_replaced(tmp_path):
+    """Corrupt entries are discarded and rebuilt"""
+    xml_str = """<?xml version="1.0"?>
+    <Database version="0">
+      <ChemicalElement id="H" mass="1.0" reference_phase="GAS" H298="0.0" S298="0.0"/>
+      <Expr id="VV0001">10000</Expr>
+      <Phase id="F(S)"><Model type="CEF"><ConstituentArray><Site id="0" ratio="1.0"><Constituent refid="H"/></Site></ConstituentArray></Model></Phase>
+    </Database>
+    """
+    read_xml_cached(Database(), StringIO(xml_str), cache_dir=tmp_path)
+    entry, = tmp_path.glob("*.pickle")
+    entry.write_bytes(b"truncated")
+    dbf = Database()
+    read_xml_cached(dbf, StringIO(xml_str), cache_dir=tmp_path)
+    assert dbf.symbols["VV0001"] == 10000.0
+    assert entry.stat().st_size > len(b"truncated")
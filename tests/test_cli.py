@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import pytest
+import pycalphad.tests
+from pycalphad import Database
+from pycalphad_xml.cli import main, DEFAULT_MANIFEST_NAME
+
+DATABASES_DIR = os.path.join(os.path.dirname(pycalphad.tests.__file__), "databases")
+
+
+def _source_tree(tmp_path):
+    # Copies of test databases in nested directories, next to a file that is not a database
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    shutil.copy(os.path.join(DATABASES_DIR, "alfe.tdb"), src / "alfe.tdb")
+    shutil.copy(os.path.join(DATABASES_DIR, "Kaye_Pd-Ru-Tc-Mo.dat"), src / "nested" / "Kaye_Pd-Ru-Tc-Mo.dat")
+    (src / "README.txt").write_text("not a database")
+    return src
+
+
+def test_convert_directory_tree(tmp_path, capsys):
+    """Databases in a directory tree are converted once, mirroring the tree, and read back"""
+    src, out = _source_tree(tmp_path), tmp_path / "out"
+    assert main(["convert", str(src), "-o", str(out), "--workers", "1", "--verify"]) == 0
+    assert sorted(path.relative_to(out).as_posix() for path in out.rglob("*")) == \
+        ["alfe.xml", "nested", "nested/Kaye_Pd-Ru-Tc-Mo.xml"]
+    assert set(Database(str(out / "alfe.xml")).phases) == set(Database(str(src / "alfe.tdb")).phases)
+    assert "2 converted, 0 up to date, 0 failed" in capsys.readouterr().out
+
+    assert main(["convert", str(src), "-o", str(out), "--workers", "1"]) == 0
+    assert "0 converted, 2 up to date, 0 failed" in capsys.readouterr().out
+
+    # Newer source
+    os.utime(src / "alfe.tdb", ns=(os.stat(out / "alfe.xml").st_atime_ns, os.stat(out / "alfe.xml").st_mtime_ns + 10**9))
+    assert main(["convert", str(src), "-o", str(out), "--workers", "2"]) == 0
+    assert "1 converted, 1 up to date, 0 failed" in capsys.readouterr().out
+
+
+def test_convert_by_hash_with_compression(tmp_path, capsys):
+    """With hash checks, outputs are up to date as long as the source contents are unchanged"""
+    src, out = _source_tree(tmp_path), tmp_path / "out"
+    args = ["convert", str(src), "-o", str(out), "--workers", "1", "--check", "hash", "--compression", "gzip"]
+    assert main(args) == 0
+    assert (out / "alfe.xml.gz").exists()
+    with open(out / DEFAULT_MANIFEST_NAME) as fd:
+        assert len(json.load(fd)) == 2
+    capsys.readouterr()
+
+    os.utime(src / "alfe.tdb")  # touched, but unchanged
+    assert main(args) == 0
+    assert "0 converted, 2 up to date, 0 failed" in capsys.readouterr().out
+    with open(src / "alfe.tdb", "a") as fd:
+        fd.write("\n$ changed\n")
+    assert main(args) == 0
+    assert "1 converted, 1 up to date, 0 failed" in capsys.readouterr().out
+
+
+def test_convert_reports_failures(tmp_path, capsys):
+    """A database that cannot be converted is reported and does not stop the others"""
+    src, out = _source_tree(tmp_path), tmp_path / "out"
+    (src / "broken.tdb").write_text("PHASE LIQUID % 1 1.0 !\nCONSTITUENT LIQUID :NOT_AN_ELEMENT: !\n")
+    assert main(["convert", str(src), "-o", str(out), "--workers", "1"]) == 1
+    output = capsys.readouterr().out
+    assert "2 converted, 0 up to date, 1 failed" in output
+    assert f"failed: {src / 'broken.tdb'}" in output
+    assert not (out / "broken.xml").exists()
+    assert [path.name for path in out.iterdir() if path.name.startswith(".tmp")] == []
+
+
+def test_convert_reports_sources_with_the_same_output(tmp_path, capsys):
+    """Sources that would be converted to the same output are failures instead of overwriting each other"""
+    src, out = _source_tree(tmp_path), tmp_path / "out"
+    shutil.copy(os.path.join(DATABASES_DIR, "alfe.tdb"), src / "alfe.dat")
+    assert main(["convert", str(src), "-o", str(out), "--workers", "2"]) == 1
+    output = capsys.readouterr().out
+    assert "1 converted, 0 up to date, 2 failed" in output
+    assert f"{out / 'alfe.xml'} is also the output of {src / 'alfe.dat'}" in output
+    assert not (out / "alfe.xml").exists()
+
+
+def test_convert_skip_unchanged(tmp_path, capsys):
+    """Outputs of sources that changed without changing the database are left untouched"""
+    src, out = _source_tree(tmp_path), tmp_path / "out"
+    assert main(["convert", str(src), "-o", str(out), "--workers", "1"]) == 0
+    capsys.readouterr()
+    output_mtime = os.stat(out / "alfe.xml").st_mtime_ns
+    with open(src / "alfe.tdb", "a") as fd:
+        fd.write("\n$ comment only\n")
+    os.utime(src / "alfe.tdb", ns=(output_mtime, output_mtime + 10**9))
+    args = ["convert", str(src), "-o", str(out), "--workers", "1", "--skip-unchanged"]
+    assert main(args) == 0
+    assert "0 converted, 2 unchanged, 0 up to date, 0 failed" in capsys.readouterr().out
+    assert os.stat(out / "alfe.xml").st_mtime_ns == output_mtime
+    # Unchanged outputs are older than their sources, and recorded in the manifest to be found up to date
+    assert main(args) == 0
+    assert "0 converted, 0 unchanged, 2 up to date, 0 failed" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(args + ["--check", "mtime"])
+
+
+def test_index_command(tmp_path, capsys, monkeypatch):
+    """Paths starting with a dash are indexed, and failures give a non-zero exit status"""
+    monkeypatch.chdir(tmp_path)
+    Database(os.path.join(DATABASES_DIR, "alfe.tdb")).to_file("-alfe.xml")
+    assert main(["index", "--", "-alfe.xml"]) == 0
+    assert (tmp_path / "-alfe.xml.index.json").exists()
+    assert main(["index", "--", "-alfe.xml", "missing.xml"]) == 1
+    output = capsys.readouterr().out
+    assert "-alfe.xml: index is up to date" in output
+    assert "missing.xml: failed" in output
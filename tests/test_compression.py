@@ -0,0 +1,47 @@
+import gzip
+import pytest
+from io import BytesIO, StringIO
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.parser import read_xml, write_xml
+from pycalphad_xml.cache import read_xml_cached
+
+
+@pytest.mark.parametrize("extension", ["gz", "bz2", "xz"])
+@select_database("Shishin_Fe-Sb-O-S_slag.dat")
+def test_compressed_file_roundtrip(load_database, tmp_path, extension):
+    """Databases written to compressed files by extension are read back transparently"""
+    dbf = Database.from_string(load_database().to_string(fmt="xml"), fmt="xml")
+    path = str(tmp_path / f"db.xml.{extension}")
+    dbf.to_file(path)
+    with open(path, "rb") as fd:
+        assert not fd.read().startswith(b"<?xml")
+    assert Database(path) == dbf
+    dbf_streamed = Database()
+    with open(path, "rb") as fd:
+        read_xml(dbf_streamed, fd, stream=True)
+    assert dbf_streamed == dbf
+    assert Database.from_file(path, fmt="xml") == dbf
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_compression_is_detected_from_content(load_database, tmp_path):
+    """Compressed content is detected by its magic bytes, whatever the file name, and output is reproducible"""
+    dbf = load_database()
+    compressed = BytesIO()
+    write_xml(dbf, compressed, compression="gzip")
+    assert gzip.decompress(compressed.getvalue()).decode() == dbf.to_string(fmt="xml")
+    compressed_again = BytesIO()
+    write_xml(dbf, compressed_again, compression="gzip")
+    assert compressed_again.getvalue() == compressed.getvalue()
+
+    path = tmp_path / "db.xml"
+    path.write_bytes(compressed.getvalue())
+    assert Database(str(path)) == Database.from_string(dbf.to_string(fmt="xml"), fmt="xml")
+    cache_dbf = Database()
+    with open(path) as fd:
+        read_xml_cached(cache_dbf, fd, cache_dir=tmp_path / "cache")
+    assert cache_dbf == Database(str(path))
+
+    with pytest.raises(ValueError):
+        write_xml(dbf, StringIO(), compression="gzip")
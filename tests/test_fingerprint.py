@@ -0,0 +1,74 @@
+import os
+from io import StringIO
+from lxml import etree
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.fingerprint import Fingerprint, node_digest
+from pycalphad_xml.parser import database_fingerprint, file_fingerprint, read_xml, write_xml
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_fingerprint_ignores_formatting_and_order(load_database):
+    """Fingerprints of the same database agree however it is written, read or formatted"""
+    dbf = load_database()
+    expected = database_fingerprint(dbf)
+    written = Fingerprint()
+    xml = StringIO()
+    write_xml(dbf, xml, fingerprint=written)
+    assert written.hexdigest() == expected
+    for kwargs in [{"stream": True}, {"workers": 2}]:
+        other = Fingerprint()
+        write_xml(dbf, StringIO(), fingerprint=other, **kwargs)
+        assert other.hexdigest() == expected
+
+    # Reversed phases and parameters, without indentation, with a comment and other metadata
+    root = etree.fromstring(xml.getvalue().encode("utf-8"), etree.XMLParser(remove_blank_text=True))
+    nodes = list(root)
+    root[:] = [node for node in nodes if node.tag != "Phase"] + [node for node in reversed(nodes) if node.tag == "Phase"]
+    for phase in root.iterchildren("Phase"):
+        phase[:] = reversed(phase)
+    root.insert(1, etree.Comment("reformatted"))
+    root.find("metadata/writer").text = "another writer"
+    reformatted = etree.tostring(root).decode("utf-8")
+    assert file_fingerprint(StringIO(reformatted)) == expected
+    read = Fingerprint()
+    read_xml(Database(), StringIO(reformatted), validate="off", phases=["LIQUID"], fingerprint=read)
+    assert read.hexdigest() == expected
+
+    changed = reformatted.replace('lower="298.15"', 'lower="298.16"', 1)
+    assert file_fingerprint(StringIO(changed)) != expected
+
+
+@select_database("alfe.tdb")
+def test_write_skip_unchanged(load_database, tmp_path):
+    """Files with the same contents are left untouched, and others are rewritten"""
+    dbf = load_database()
+    path = tmp_path / "alfe.xml.gz"
+    with open(path, "a+b") as fd:
+        write_xml(dbf, fd, compression="gzip", skip_unchanged=True)
+    contents = path.read_bytes()
+    assert Database(str(path)) == Database.from_string(dbf.to_string(fmt="xml"), fmt="xml")
+
+    stat = os.stat(path)
+    fingerprint = Fingerprint()
+    with open(path, "r+b") as fd:
+        assert write_xml(dbf, fd, compression="gzip", skip_unchanged=True, fingerprint=fingerprint) is None
+    assert os.stat(path).st_mtime_ns == stat.st_mtime_ns
+    assert fingerprint.hexdigest() == database_fingerprint(dbf)
+
+    path.write_text("not a database")
+    with open(path, "r+b") as fd:
+        write_xml(dbf, fd, compression="gzip", skip_unchanged=True)
+    assert path.read_bytes() == contents
+
+
+def test_fingerprint_separates_numbers_in_lists():
+    """Lists of numbers that only differ in how their digits are separated have different digests"""
+    def parameter(**lists):
+        children = "".join(f"<{tag}>{text}</{tag}>" for tag, text in lists.items())
+        return etree.fromstring(f'<Phase id="LIQUID"><Parameter type="G">{children}</Parameter></Phase>')
+
+    assert node_digest(parameter(Coordinations="6.0 6.0 1.0 10.0")) != node_digest(parameter(Coordinations="6.0 6.0 1.01 0.0"))
+    assert node_digest(parameter(Exponents="1.0 10.0 0.0 0.0")) != node_digest(parameter(Exponents="1.01 0.0 0.0 0.0"))
+    # Indentation and runs of whitespace are not significant
+    assert node_digest(parameter(Exponents="1.0 10.0 0.0 0.0")) == node_digest(parameter(Exponents="\n  1.0  10.0\t0.0 0.0 "))
@@ -0,0 +1,101 @@
+import json
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pycalphad import Database, Model
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.parser import read_xml
+from pycalphad_xml.index import INDEX_SUFFIX, build_index, default_index_path, load_index, read_xml_indexed
+
+
+@select_database("Kaye_Pd-Ru-Tc-Mo.dat")
+def test_indexed_read_matches_phase_selection(load_database, tmp_path):
+    """Reading phases through the index gives the same Database as selecting them in read_xml"""
+    path = tmp_path / "kaye.xml"
+    load_database().to_file(str(path))
+    phases = ["LIQN", "SIGMA"]
+    expected = Database()
+    with open(path) as fd:
+        read_xml(expected, fd, phases=phases)
+    dbf = Database()
+    read_xml_indexed(dbf, path, phases)
+    assert os.path.exists(default_index_path(path))
+    assert dbf == expected
+    assert set(dbf.phases) == set(phases)
+    assert set(dbf.symbols).issubset(load_database().symbols)
+
+
+@select_database("FeNi_deep_branching.tdb")
+def test_indexed_read_of_ordered_phase_loads_its_disordered_part(load_database, tmp_path):
+    """An ordered phase read through the index brings the disordered part its Model is built from"""
+    path = tmp_path / "feni.xml"
+    load_database().to_file(str(path))
+    dbf = Database()
+    read_xml_indexed(dbf, path, ["ORD_FCC"])
+    assert set(dbf.phases) == {"ORD_FCC", "FCC_A1"}
+    expected = Database()
+    with open(path) as fd:
+        read_xml(expected, fd, phases=["ORD_FCC"])
+    assert dbf == expected
+    comps = ["FE", "NI", "VA"]
+    assert Model(dbf, comps, "ORD_FCC").GM == Model(Database(str(path)), comps, "ORD_FCC").GM
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_index_byte_ranges(load_database, tmp_path):
+    """Each entry covers exactly one top-level element"""
+    path = tmp_path / "alni.xml"
+    load_database().to_file(str(path))
+    index = build_index(path)
+    data = path.read_bytes()
+    tags = [tag for tag, _, _, _, _ in index["entries"]]
+    assert {"ChemicalElement", "Expr", "Phase"}.issubset(tags)
+    for tag, element_id, start, end, _ in index["entries"]:
+        fragment = data[start:end]
+        assert fragment.startswith(b"<" + tag.encode())
+        assert fragment.endswith(b"</" + tag.encode() + b">") or fragment.endswith(b"/>")
+        if tag == "Phase":
+            assert f'id="{element_id}"'.encode() in fragment
+
+
+@select_database("alfe.tdb")
+def test_stale_index_is_rebuilt(load_database, tmp_path):
+    """An index is only used while the file is unchanged"""
+    path = tmp_path / "alfe.xml"
+    dbf = load_database()
+    dbf.to_file(str(path))
+    index = build_index(path)
+    assert load_index(path, verify=True) == index
+
+    # Same size and modification time, different contents: only detected by the hash
+    stat = os.stat(path)
+    path.write_bytes(path.read_bytes().replace(b'298.15', b'298.16', 1))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_index(path) is not None
+    assert load_index(path, verify=True) is None
+
+    path.write_bytes(path.read_bytes() + b"\n")
+    assert load_index(path) is None
+    read_xml_indexed(Database(), path, ["LIQUID"])
+    with open(default_index_path(path)) as fd:
+        assert json.load(fd)["size"] == os.stat(path).st_size
+
+
+@select_database("alfe.tdb")
+def test_concurrent_index_builds(load_database, tmp_path):
+    """Indexes rebuilt concurrently by several readers do not replace each other's temporary files"""
+    path = tmp_path / "alfe.xml"
+    load_database().to_file(str(path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        indexes = list(executor.map(lambda _: build_index(path), range(16)))
+    assert all(index == indexes[0] for index in indexes)
+    assert load_index(path) == indexes[0]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["alfe.xml", "alfe.xml" + INDEX_SUFFIX]
+
+
+@select_database("alfe.tdb")
+def test_compressed_file_is_not_indexed(load_database, tmp_path):
+    path = tmp_path / "alfe.xml.gz"
+    load_database().to_file(str(path))
+    with pytest.raises(ValueError):
+        build_index(path)
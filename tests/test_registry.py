@@ -0,0 +1,96 @@
+import os
+import pytest
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.registry import DatabaseRegistry
+from pycalphad_xml.stats import Stats
+
+
+@select_database("alfe.tdb")
+def test_registry_reuses_database_until_file_changes(load_database, tmp_path):
+    """Repeated loads return the shared Database and a changed file is read again"""
+    path = tmp_path / "alfe.xml"
+    load_database().to_file(str(path))
+    registry = DatabaseRegistry()
+    dbf = registry.load(path)
+    assert registry.load(str(path)) is dbf
+    assert registry.load(path, phases=["LIQUID"]) is not dbf
+    assert registry.info()[:4] == (1, 2, 0, 2)
+
+    # Same size, later modification time
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    reloaded = registry.load(path)
+    assert reloaded is not dbf
+    assert reloaded == dbf
+    assert registry.info().reloads == 1
+
+
+@select_database("alfe.tdb")
+def test_registry_copy_is_independent(load_database, tmp_path):
+    path = tmp_path / "alfe.xml"
+    load_database().to_file(str(path))
+    registry = DatabaseRegistry()
+    dbf = registry.load(path)
+    copied = registry.load(path, copy=True)
+    assert copied is not dbf
+    assert copied == dbf
+    copied.symbols.clear()
+    copied._parameters.truncate()
+    copied.elements.add("XX")
+    assert len(dbf.symbols) > 0 and len(dbf._parameters) > 0 and "XX" not in dbf.elements
+    assert registry.load(path) is dbf
+
+
+@select_database("alfe.tdb")
+def test_registry_evicts_least_recently_used(load_database, tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"alfe{i}.xml")
+        load_database().to_file(str(paths[-1]))
+    registry = DatabaseRegistry(max_entries=2)
+    first = registry.load(paths[0])
+    registry.load(paths[1])
+    registry.load(paths[0])
+    registry.load(paths[2])  # evicts paths[1]
+    assert registry.info().entries == 2
+    assert registry.load(paths[0]) is first
+    assert registry.info().misses == 3
+    registry.load(paths[1])
+    assert registry.info().misses == 4
+
+    sized = DatabaseRegistry(max_size=os.stat(paths[0]).st_size)
+    sized.load(paths[0])
+    sized.load(paths[1])
+    assert sized.info().entries == 1
+    sized.invalidate()
+    assert sized.info().entries == 0
+
+
+@select_database("alfe.tdb")
+def test_registry_concurrent_loads_read_once(load_database, tmp_path):
+    path = tmp_path / "alfe.xml"
+    load_database().to_file(str(path))
+    registry = DatabaseRegistry()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        loaded = list(executor.map(lambda _: registry.load(path), range(32)))
+    assert all(dbf is loaded[0] for dbf in loaded)
+    assert isinstance(loaded[0], Database)
+    assert registry.info().entries == 1
+
+
+@select_database("alfe.tdb")
+def test_registry_per_read_arguments(load_database, tmp_path):
+    """Cancellation checks are not part of the options that loads are shared by, and failed reads release their key"""
+    path = tmp_path / "alfe.xml"
+    load_database().to_file(str(path))
+    registry = DatabaseRegistry()
+    with pytest.raises(CancelledError):
+        registry.load(path, phases=["LIQUID"], cancel_check=lambda: True)
+    assert registry._loading == {}
+    dbf = registry.load(path, phases=["LIQUID"], cancel_check=lambda: False)
+    assert registry.load(path, phases=["LIQUID"]) is dbf
+    assert registry.info().entries == 1
+    with pytest.raises(ValueError):
+        registry.load(path, stats=Stats())
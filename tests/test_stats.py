@@ -0,0 +1,50 @@
+import json
+from io import StringIO
+from pycalphad import Database
+from pycalphad.tests.fixtures import select_database, load_database
+from pycalphad_xml.parser import read_xml, write_xml
+from pycalphad_xml.stats import Stats
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_read_stats_count_database_contents(load_database):
+    """Counts match the Database that was read and the slowest phases are bounded and sorted"""
+    xml_str = load_database().to_string(fmt="xml")
+    stats = Stats(n_slowest=3)
+    dbf = Database()
+    read_xml(dbf, StringIO(xml_str), stats=stats)
+    assert stats.counts["elements"] == len(dbf.elements)
+    assert stats.counts["exprs"] == len(dbf.symbols)
+    assert stats.counts["phases"] == len(dbf.phases)
+    assert stats.counts["parameters"] == len(dbf._parameters)
+    assert {"parse", "validate", "phases", "convert", "add_parameter", "process_parameter_queue"}.issubset(stats.times)
+    times = [seconds for _, seconds in stats.slowest_phases]
+    assert len(times) == 3
+    assert times == sorted(times, reverse=True)
+
+    exported = json.loads(stats.to_json())
+    assert exported["counts"] == dict(stats.counts)
+    assert [entry["phase"] for entry in exported["slowest_phases"]] == [name for name, _ in stats.slowest_phases]
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_parallel_read_stats_are_merged(load_database):
+    """Statistics collected in worker processes are merged into the caller's collector"""
+    xml_str = load_database().to_string(fmt="xml")
+    serial_stats, parallel_stats = Stats(), Stats()
+    read_xml(Database(), StringIO(xml_str), stats=serial_stats)
+    read_xml(Database(), StringIO(xml_str), workers=2, stats=parallel_stats)
+    assert parallel_stats.counts == serial_stats.counts
+    assert {name for name, _ in parallel_stats.slowest_phases} == {name for name, _ in serial_stats.slowest_phases}
+
+
+@select_database("Shishin_Fe-Sb-O-S_slag.dat")
+def test_write_stats(load_database):
+    """Writes record the phases and parameters written, whether streamed or not"""
+    dbf = load_database()
+    for stream in (False, True):
+        stats = Stats()
+        write_xml(dbf, StringIO(), stream=stream, stats=stats)
+        assert stats.counts["phases"] == len(dbf.phases)
+        assert stats.counts["parameters"] == len(dbf._parameters)
+        assert {"phases", "validate", "serialize"}.issubset(stats.times)
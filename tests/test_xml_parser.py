@@ -1,8 +1,15 @@
 import pytest
-from pycalphad import Database, Model, calculate, variables as v
+from concurrent.futures import CancelledError
+from copy import deepcopy
+from io import BytesIO, StringIO
+import numpy as np
+from pycalphad import Database, Model, calculate, equilibrium, variables as v
 from pycalphad.models.model_mqmqa import ModelMQMQA
 from pycalphad.tests.fixtures import select_database, load_database
 from pycalphad.tests.test_energy import check_energy
+from pycalphad.io.tdb import _sympify_string
+from symengine import And, Piecewise, Symbol, log
+from pycalphad_xml.parser import _get_relaxng, _parse_polynomial, read_xml, write_xml, clear_expression_cache, expression_cache_info, LazyExpr, hoist_common_subexpressions, ParseContext, replace_subexpressions
 
 @pytest.mark.xfail(reason="SymEngine is incorrect in equality comparison for expressions")
 # e.g. these are not equal:
@@ -108,4 +115,358 @@ def test_exprs_without_intervals_are_read():
     db = Database.from_string(XML_STR, fmt="xml")
 
     assert db.symbols["VV0000"].args[0] == 10000.0
-    assert db.symbols["VV0001"] == 10000.0
\ No newline at end of file
+    assert db.symbols["VV0001"] == 10000.0
+
+
+def test_parameter_value_text_around_child_elements():
+    """Parameter values are read from all text directly inside the Parameter, including text after child elements"""
+    XML_STR = """<?xml version="1.0"?>
+    <Database version="0">
+      <ChemicalElement id="H" mass="1.0" reference_phase="GAS" H298="0.0" S298="0.0"/>
+      <Phase id="GAS"><Model type="CEF"><ConstituentArray><Site id="0" ratio="1.0"><Constituent refid="H"/></Site></ConstituentArray></Model>
+        <Parameter type="G">-1000.0 <!-- comment --><Order>0</Order><ConstituentArray><Site refid="0"><Constituent refid="H"/></Site></ConstituentArray> + 2.0*T</Parameter>
+      </Phase>
+    </Database>
+    """
+    db = Database.from_string(XML_STR, fmt="xml")
+    param, = db._parameters.all()
+    assert param["constituent_array"] == ((v.Species("H"),),)
+    assert param["parameter_order"] == 0
+    assert param["parameter"] == _sympify_string("-1000.0+2.0*T")
+
+INVALID_XML_STR = """<?xml version="1.0"?>
+<Database version="0">
+  <ChemicalElement id="H" mass="1.0" reference_phase="GAS" H298="0.0" S298="0.0"/>
+  <Expr id="VV0001">10000</Expr>
+</Database>
+"""
+
+
+def test_relaxng_schema_is_compiled_once():
+    """The compiled RelaxNG schema is cached and shared between calls"""
+    assert _get_relaxng() is _get_relaxng()
+
+
+def test_read_xml_validation_modes():
+    """Invalid databases raise in strict mode, load when validation is off and report later when deferred"""
+    with pytest.raises(ValueError):
+        read_xml(Database(), StringIO(INVALID_XML_STR), validate="strict")
+
+    dbf = Database()
+    assert read_xml(dbf, StringIO(INVALID_XML_STR), validate="off") is None
+    assert dbf.symbols["VV0001"] == 10000.0
+
+    dbf = Database()
+    validation = read_xml(dbf, StringIO(INVALID_XML_STR), validate="deferred")
+    assert dbf.symbols["VV0001"] == 10000.0
+    with pytest.raises(ValueError):
+        validation.result(timeout=60)
+
+    with pytest.raises(ValueError):
+        read_xml(Database(), StringIO(INVALID_XML_STR), validate="sometimes")
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_write_xml_deferred_validation(load_database):
+    """Deferred validation of a valid written database resolves without error"""
+    dbf = load_database()
+    validation = write_xml(dbf, StringIO(), validate="deferred")
+    assert validation.result(timeout=60) is None
+
+
+@pytest.mark.parametrize("load_database", ["alni_dupin_2001.tdb", "Kaye_Pd-Ru-Tc-Mo.dat", "Shishin_Fe-Sb-O-S_slag.dat"], indirect=True)
+def test_streaming_write_matches_tree_write(load_database):
+    """Streaming writes produce the same document as serializing the full tree, including mixed content"""
+    dbf = load_database()
+    expected = StringIO()
+    write_xml(dbf, expected)
+    streamed = StringIO()
+    assert write_xml(dbf, streamed, stream=True) is None
+    assert streamed.getvalue() == expected.getvalue()
+    # Binary files are written the encoded document directly
+    for stream in (False, True):
+        encoded = BytesIO()
+        write_xml(dbf, encoded, stream=stream)
+        assert encoded.getvalue() == expected.getvalue().encode("utf-8")
+    with pytest.raises(ValueError):
+        write_xml(dbf, StringIO(), validate="deferred", stream=True)
+
+
+@pytest.mark.parametrize("load_database", ["alni_dupin_2001.tdb", "Kaye_Pd-Ru-Tc-Mo.dat", "Shishin_Fe-Sb-O-S_slag.dat"], indirect=True)
+def test_parallel_write_matches_serial_write(load_database):
+    """Phases serialized in a process pool are assembled into the same document as a serial write"""
+    dbf = load_database()
+    for kwargs in [{}, {"hoist": True}]:
+        expected = StringIO()
+        write_xml(dbf, expected, **kwargs)
+        for stream in (False, True):
+            parallel = StringIO()
+            assert write_xml(dbf, parallel, workers=2, stream=stream, **kwargs) is None
+            assert parallel.getvalue() == expected.getvalue()
+    with pytest.raises(ValueError):
+        write_xml(dbf, StringIO(), validate="deferred", workers=2)
+
+
+@select_database("alfe.tdb")
+def test_streaming_write_validates_each_node(load_database):
+    """Invalid nodes fail validation when streaming, even though only part of the database is in memory"""
+    dbf = deepcopy(load_database())
+    # Parameters of undefined phases create a Phase node without a Model
+    dbf.add_parameter("G", "NO_MODEL", [["FE"]], 0, 1.0, force_insert=True)
+    with pytest.raises(ValueError):
+        write_xml(dbf, StringIO(), stream=True)
+    write_xml(dbf, StringIO(), validate="warn", stream=True)
+
+
+@select_database("Shishin_Fe-Sb-O-S_slag.dat")
+def test_streaming_read_matches_tree_read(load_database):
+    """Streaming reads produce the same Database as reading the full document tree"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf = Database.from_string(xml_str, fmt="xml")
+    dbf_streamed = Database()
+    read_xml(dbf_streamed, StringIO(xml_str), stream=True)
+    assert dbf_streamed == dbf
+    with pytest.raises(ValueError):
+        read_xml(Database(), StringIO(xml_str), validate="strict", stream=True)
+
+
+def test_streaming_read_skips_nested_elements():
+    """Only top-level elements are dispatched when streaming, not ChemicalElement nodes nested in Species"""
+    xml_str = """<?xml version="1.0"?>
+    <Database version="0">
+      <ChemicalElement id="FE" mass="55.847" reference_phase="BCC_A2" H298="0.0" S298="0.0"/>
+      <Species id="FE2" charge="2.0"><ChemicalElement refid="FE" ratio="1.0"/></Species>
+      <Expr id="GHSERFE">-1225.7+124.134*T</Expr>
+      <Phase id="LIQUID"><Model type="CEF"><ConstituentArray><Site id="0" ratio="1.0"><Constituent refid="FE2"/></Site></ConstituentArray></Model></Phase>
+    </Database>
+    """
+    dbf = Database()
+    read_xml(dbf, StringIO(xml_str), stream=True)
+    assert dbf.elements == {"FE"}
+    assert {s.name for s in dbf.species} == {"FE", "FE2"}
+    assert dbf == Database.from_string(xml_str, fmt="xml")
+
+
+def test_repeated_expressions_hit_the_cache():
+    """Repeated expression text and intervals are converted once and shared"""
+    xml_str = """<?xml version="1.0"?>
+    <Database version="0">
+      <ChemicalElement id="H" mass="1.0" reference_phase="GAS" H298="0.0" S298="0.0"/>
+      <Expr id="VV0000"><Interval in="T" lower="298.15" upper="6000.0">-1000 + 2*T*ln(T)</Interval></Expr>
+      <Expr id="VV0001"><Interval in="T" lower="298.15" upper="6000">-1000+2*T*ln(T)</Interval></Expr>
+      <Expr id="VV0002"><Interval in="T" lower="298.15">-1000+2*T*ln(T)</Interval></Expr>
+      <Phase id="F(S)"><Model type="CEF"><ConstituentArray><Site id="0" ratio="1.0"><Constituent refid="H"/></Site></ConstituentArray></Model></Phase>
+    </Database>
+    """
+    clear_expression_cache()
+    dbf = Database.from_string(xml_str, fmt="xml")
+    cache_info = expression_cache_info()
+    # One miss for the interval body and one for the (empty) text outside the intervals
+    assert cache_info["expressions"].misses == 2
+    assert cache_info["intervals"].misses == 2
+    assert cache_info["intervals"].hits == 1
+    assert dbf.symbols["VV0000"] == dbf.symbols["VV0001"]
+    assert dbf.symbols["VV0000"] != dbf.symbols["VV0002"]
+    clear_expression_cache()
+    assert expression_cache_info()["expressions"].currsize == 0
+
+
+@pytest.mark.parametrize("math_string", [
+    "-1000.5+12.25*T-2.5*T*ln(T)+77500.0*T**(-1)+0.0015*T**2-2.5e-07*T**3",
+    "GHSERAL+2*GHSERNI-3.5*T",
+    "-T+1.0*T*LN(T)+1E5*T**7.0",
+    "1*T+3",
+    ".5+2*1.5*GHSERAL*T**(-9)",
+])
+def test_polynomial_fast_path_matches_sympify(math_string):
+    """Canonical polynomial expressions are parsed by the fast path to the same expression as the general parser"""
+    fast = _parse_polynomial(math_string)
+    reference = _sympify_string(math_string+'+0')
+    assert fast is not None
+    assert fast == reference
+    assert str(fast) == str(reference)
+
+
+@pytest.mark.parametrize("math_string", ["", "exp(T)", "T*T", "GHSERAL+GHSERAL", "R*T", "1/3*T", "GHSERAL**2", "ln(P)"])
+def test_polynomial_fast_path_falls_back(math_string):
+    """Expressions outside the canonical polynomial form are left to the general parser"""
+    assert _parse_polynomial(math_string) is None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@select_database("Shishin_Fe-Sb-O-S_slag.dat")
+def test_parallel_read_matches_serial_read(load_database, stream):
+    """Parsing phases in a process pool produces the same Database as parsing them serially"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf = Database.from_string(xml_str, fmt="xml")
+    dbf_parallel = Database()
+    read_xml(dbf_parallel, StringIO(xml_str), validate="off", stream=stream, workers=2)
+    assert dbf_parallel == dbf
+    assert list(dbf_parallel.phases) == list(dbf.phases)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+@select_database("crtiv_ghosh.tdb")
+def test_subset_read_matches_full_read(load_database, workers):
+    """Loading a subset of elements and phases prunes parameters and functions without changing equilibrium"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf_full = Database.from_string(xml_str, fmt="xml")
+    dbf_subset = Database()
+    read_xml(dbf_subset, StringIO(xml_str), elements=["CR", "TI", "VA"], phases=["LIQUID", "BCC_A2", "HCP_A3"], workers=workers)
+    assert set(dbf_subset.phases) == {"LIQUID", "BCC_A2", "HCP_A3"}
+    assert len(dbf_subset._parameters) < len(dbf_full._parameters)
+    assert set(dbf_subset.symbols) < set(dbf_full.symbols)
+    for param in dbf_subset._parameters.all():
+        assert all(sp.name in {"CR", "TI", "VA"} for subl in param["constituent_array"] for sp in subl)
+
+    comps = ["CR", "TI", "VA"]
+    phases = ["LIQUID", "BCC_A2", "HCP_A3"]
+    conds = {v.T: (1000, 2200, 400), v.P: 101325, v.X("CR"): 0.3, v.N: 1}
+    eq_full = equilibrium(dbf_full, comps, phases, conds)
+    eq_subset = equilibrium(dbf_subset, comps, phases, conds)
+    np.testing.assert_allclose(eq_subset.GM.values, eq_full.GM.values)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@select_database("FeNi_deep_branching.tdb")
+def test_selected_ordered_phase_loads_its_disordered_part(load_database, stream):
+    """An ordered phase selected on its own brings the disordered part its Model is built from"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf_subset = Database()
+    read_xml(dbf_subset, StringIO(xml_str), phases=["ORD_FCC"], stream=stream, validate="off")
+    assert set(dbf_subset.phases) == {"ORD_FCC", "FCC_A1"}
+    dbf_full = Database.from_string(xml_str, fmt="xml")
+    assert set(dbf_subset.symbols) <= set(dbf_full.symbols)
+    comps = ["FE", "NI", "VA"]
+    assert Model(dbf_subset, comps, "ORD_FCC").GM == Model(dbf_full, comps, "ORD_FCC").GM
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@select_database("alni_dupin_2001.tdb")
+def test_cancel_check_stops_read_and_write(load_database, stream):
+    """Reads and writes stop at the first element for which cancel_check returns True, without stats"""
+    dbf = load_database()
+    xml_str = dbf.to_string(fmt="xml")
+    calls = []
+
+    def cancel_after(n):
+        calls.clear()
+        return lambda: calls.append(None) or len(calls) > n
+
+    dbf_partial = Database()
+    with pytest.raises(CancelledError):
+        read_xml(dbf_partial, StringIO(xml_str), stream=stream, validate="off", cancel_check=cancel_after(3))
+    assert len(calls) == 4
+    assert len(dbf_partial.elements) <= 3 and len(dbf_partial._parameters) == 0
+    with pytest.raises(CancelledError):
+        write_xml(dbf, StringIO(), stream=stream, cancel_check=cancel_after(3))
+    assert len(calls) == 4
+
+    # When selecting phases, the expressions converted last are checked too
+    read_xml(Database(), StringIO(xml_str), stream=stream, validate="off", phases=["LIQUID"],
+             cancel_check=cancel_after(len(xml_str)))
+    n_calls = len(calls)
+    assert n_calls > len(dbf.phases) + len(dbf.symbols)
+    dbf_partial = Database()
+    with pytest.raises(CancelledError):
+        read_xml(dbf_partial, StringIO(xml_str), stream=stream, validate="off", phases=["LIQUID"],
+                 cancel_check=cancel_after(n_calls - 1))
+    assert "LIQUID" in dbf_partial.phases and len(dbf_partial._parameters) == 0
+
+
+@select_database("alni_dupin_2001.tdb")
+def test_lazy_read_converts_values_on_first_access(load_database):
+    """Lazily loaded databases only convert the parameters a Model uses and compare equal to eagerly loaded ones"""
+    xml_str = load_database().to_string(fmt="xml")
+    dbf = Database.from_string(xml_str, fmt="xml")
+    dbf_lazy = Database()
+    read_xml(dbf_lazy, StringIO(xml_str), lazy=True)
+    raw_params = dbf_lazy._parameters.storage.read()[dbf_lazy._parameters.default_table_name].values()
+    assert all(isinstance(param["parameter"], LazyExpr) for param in raw_params)
+
+    mod_lazy = Model(dbf_lazy, ["AL", "VA"], "LIQUID")
+    num_converted = sum(param["parameter"]._value is not None for param in raw_params)
+    assert 0 < num_converted < len(raw_params)
+    assert mod_lazy.GM == Model(dbf, ["AL", "VA"], "LIQUID").GM
+    assert dbf_lazy == dbf
+    assert dbf_lazy.symbols["GHSERAL"] == dbf.symbols["GHSERAL"]
+
+
+@pytest.mark.parametrize("load_database", ["Shishin_Fe-Sb-O-S_slag.dat", "Kaye_Pd-Ru-Tc-Mo.dat"], indirect=True)
+def test_bulk_parameter_records_match_add_parameter(load_database):
+    """Parameters inserted in bulk, including MQMQA and QKT fields, are the records Database.add_parameter builds"""
+    dbf = Database.from_string(load_database().to_string(fmt="xml"), fmt="xml")
+    for record in dbf._parameters.all():
+        fields = dict(record)
+        args = [fields.pop(key) for key in ("parameter_type", "phase_name", "constituent_array", "parameter_order", "parameter")]
+        args[2] = [[sp.name for sp in subl] for subl in args[2]]
+        diffusing_species = fields.pop("diffusing_species").name
+        ref = fields.pop("reference")
+        expected = Database()
+        expected.species = dbf.species
+        expected.add_parameter(*args, ref=ref, diffusing_species=diffusing_species, force_insert=False, **fields)
+        assert expected._parameter_queue == [dict(record)]
+
+
+@pytest.mark.parametrize("load_database", ["Shishin_Fe-Sb-O-S_slag.dat", "alni_dupin_2001.tdb"], indirect=True)
+def test_parameters_share_constituents(load_database):
+    """Parameters with the same constituents share one constituent array, made of the Species of the database
+    or, for undefined constituents such as wildcards, of one Species per name"""
+    dbf = Database.from_string(load_database().to_string(fmt="xml"), fmt="xml")
+    species = {sp.name: sp for sp in dbf.species}
+    arrays = {}
+    for record in dbf._parameters.all():
+        constituent_array = record["constituent_array"]
+        assert arrays.setdefault(constituent_array, constituent_array) is constituent_array
+        assert all(species.setdefault(sp.name, sp) is sp for subl in constituent_array for sp in subl)
+    assert len(arrays) < len(dbf._parameters)
+
+
+def test_constituent_arrays_are_interned_by_sorted_names():
+    context = ParseContext()
+    interned = context.constituent_array([("B", "A"), ("VA",)])
+    assert context.constituent_array([("A", "B"), ("VA",)]) is interned
+    assert [[sp.name for sp in subl] for subl in interned] == [["A", "B"], ["VA"]]
+    ordered = context.constituent_array([("B", "A"), ("VA",)], ordered=True)
+    assert [sp.name for sp in ordered[0]] == ["B", "A"]
+    assert ordered[0][0] is interned[0][1]
+
+
+def test_hoist_common_subexpressions():
+    """Repeated subexpressions are named once and inlined symbol values refer to their symbol"""
+    pw = Piecewise((-1000.0 + 10.0*v.T - 2.0*v.T*log(v.T) + 1e-3*v.T**2, And(298.15 <= v.T, v.T < 3000.0)), (0, True))
+    ghser = -2000.0 + 20.0*v.T - 4.0*v.T*log(v.T) + 2e-3*v.T**2
+    symbols, replacements = hoist_common_subexpressions({"GHSERXX": ghser, "CSE1": v.T}, [2*pw, 3*pw + v.T, ghser, v.T**2])
+    assert symbols["CSE2"] == pw
+    assert set(symbols) == {"GHSERXX", "CSE1", "CSE2"}
+    assert (3*pw + v.T).xreplace(replacements) == 3*Symbol("CSE2") + v.T
+    assert ghser.xreplace(replacements) == Symbol("GHSERXX")
+    assert (v.T**2).xreplace(replacements) == v.T**2
+
+
+def test_hoisting_leaves_piecewise_conditions_unchanged():
+    """Subexpressions are not replaced in the conditions of Piecewise expressions, which must remain intervals in T"""
+    pw = Piecewise((-1000.0 + 10.0*v.T, And(298.15 <= v.T, v.T < 3000.0)), (0, True))
+    rewritten = replace_subexpressions(2*pw, {v.T: Symbol("X")})
+    assert rewritten == 2*Piecewise((-1000.0 + 10.0*Symbol("X"), And(298.15 <= v.T, v.T < 3000.0)), (0, True))
+    # With min_size=1, T itself is hoisted from the values of the hoisted Piecewise, but not from its condition
+    symbols, replacements = hoist_common_subexpressions({}, [pw, 2*pw, 3*v.T], min_size=1)
+    assert symbols == {"CSE1": v.T,
+                       "CSE2": Piecewise((-1000.0 + 10.0*Symbol("CSE1"), And(298.15 <= v.T, v.T < 3000.0)), (0, True))}
+
+
+@select_database("crtiv_ghosh.tdb")
+def test_hoisted_write_evaluates_to_same_energies(load_database):
+    """Databases written with hoisted subexpressions are smaller and read back to the same Gibbs energies"""
+    dbf = load_database()
+    plain, hoisted = StringIO(), StringIO()
+    write_xml(dbf, plain)
+    write_xml(dbf, hoisted, hoist=True)
+    assert 'id="CSE1"' in hoisted.getvalue()
+    assert len(hoisted.getvalue()) < len(plain.getvalue())
+    dbf_plain = Database.from_string(plain.getvalue(), fmt="xml")
+    dbf_hoisted = Database.from_string(hoisted.getvalue(), fmt="xml")
+    for phase_name in ["LIQUID", "BCC_A2", "LAVES_C14"]:
+        res_plain = calculate(dbf_plain, ["CR", "TI", "V", "VA"], phase_name, T=[300, 1500, 2500], P=101325, N=1, pdens=10)
+        res_hoisted = calculate(dbf_hoisted, ["CR", "TI", "V", "VA"], phase_name, T=[300, 1500, 2500], P=101325, N=1, pdens=10)
+        np.testing.assert_allclose(res_hoisted.GM.values, res_plain.GM.values)